@@ -0,0 +1,75 @@
+"""Compares master response parser with per entry one it replaced
+
+Run it from repository root:
+
+    $ python benchmarks/master.py
+"""
+import os
+import os.path
+import socket
+import struct
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from xrcon.utils import (  # NOQA
+    parse_servers_response, MASTER_RESPONSE_HEADER, MASTER_EOF, MASTER_EOT
+)
+
+
+NUMBER = 20
+SERVERS = 30000
+PER_PACKET = 190  # entries which fit to 1400 bytes packet
+
+
+def make_packets():
+    entries = [b'\\' + os.urandom(4) + struct.pack('>H', 26000 + i % 100)
+               for i in range(SERVERS)]
+    packets = []
+    for i in range(0, SERVERS, PER_PACKET):
+        last = i + PER_PACKET >= SERVERS
+        packets.append(MASTER_RESPONSE_HEADER +
+                       b''.join(entries[i:i + PER_PACKET]) +
+                       (MASTER_EOT if last else MASTER_EOF))
+    return packets
+
+
+def parse_servers_response_old(servers_packet):
+    "Implementation before iter_unpack, without StopIteration"
+    data = servers_packet[len(MASTER_RESPONSE_HEADER):]
+    for i in range(0, len(data), 7):
+        server_data = data[i:i + 7]
+        if server_data in (MASTER_EOT, MASTER_EOF):
+            return
+
+        s, server_ip, server_port = struct.unpack('>c4sH', server_data)
+        if s != b'\\':
+            raise ValueError('Bad packet format')
+
+        yield socket.inet_ntoa(server_ip), server_port
+
+    raise ValueError('Packet have no EOT signature')
+
+
+def bench(name, fun):
+    best = min(timeit.repeat(fun, number=NUMBER, repeat=5)) / NUMBER
+    print("{name:<32} {time:>8.2f} ms per {servers} servers".format(
+        name=name, time=best * 1000, servers=SERVERS))
+    return best
+
+
+def main():
+    packets = make_packets()
+    old = bench('per entry parser', lambda: [
+        list(parse_servers_response_old(p)) for p in packets])
+    new = bench('parse_servers_response', lambda: [
+        parse_servers_response(p) for p in packets])
+    print("speedup: {0:0.2f}x".format(old / new))
+    packed = bench('parse_servers_response packed', lambda: [
+        parse_servers_response(p, packed=True) for p in packets])
+    print("speedup: {0:0.2f}x".format(old / packed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Compares built-in MD4 with OpenSSL one and batch signing with
+signing command by command
+
+Run it from repository root:
+
+    $ python benchmarks/md4.py
+"""
+import hmac
+import os.path
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from xrcon import md4  # NOQA
+from xrcon.utils import RconSigner, has_openssl_md4, openssl_md4  # NOQA
+
+
+NUMBER = 2000
+PASSWORD = b'secret password'
+MESSAGE = b'100.000000 sv_cmd say hello world'
+COMMANDS = ['sv_cmd say hello world {0}'.format(i) for i in range(100)]
+
+
+def bench(name, fun, number=NUMBER, unit='ops'):
+    best = min(timeit.repeat(fun, number=number, repeat=5))
+    print("{name:<32} {rate:>10.0f} {unit}/s".format(
+        name=name, rate=number / best, unit=unit))
+    return best
+
+
+def main():
+    builtin = bench('md4.new', lambda: md4.new(MESSAGE).digest())
+    builtin_hmac = bench('hmac builtin',
+                         lambda: hmac.new(PASSWORD, MESSAGE, md4.new).digest())
+    if has_openssl_md4():
+        openssl = bench('openssl md4', lambda: openssl_md4(MESSAGE).digest())
+        openssl_hmac = bench(
+            'hmac openssl',
+            lambda: hmac.new(PASSWORD, MESSAGE, openssl_md4).digest())
+        print("openssl is faster: {0:0.2f}x digest, {1:0.2f}x hmac\n".format(
+            builtin / openssl, builtin_hmac / openssl_hmac))
+    else:
+        print("openssl has no MD4\n")
+
+    signer = RconSigner(PASSWORD)
+    single = bench('RconSigner.time_packet',
+                   lambda: [signer.time_packet(cmd) for cmd in COMMANDS],
+                   number=NUMBER // 100, unit='batches')
+    batch = bench('RconSigner.time_packets',
+                  lambda: signer.time_packets(COMMANDS),
+                  number=NUMBER // 100, unit='batches')
+    print("speedup: {0:0.2f}x".format(single / batch))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Compares secure rcon packet signing with and without reusable signer
+
+Run it from repository root:
+
+    $ python benchmarks/signing.py
+"""
+import os.path
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from xrcon.utils import (  # NOQA
+    RconSigner, rcon_secure_time_packet, rcon_secure_challenge_packet
+)
+
+
+NUMBER = 20000
+PASSWORD = 'secret password'
+COMMAND = 'sv_cmd say hello world'
+CHALLENGE = '11111111111'
+
+
+def bench(name, fun):
+    best = min(timeit.repeat(fun, number=NUMBER, repeat=5))
+    print("{name:<32} {rate:>10.0f} packets/s".format(
+        name=name, rate=NUMBER / best))
+    return best
+
+
+def main():
+    signer = RconSigner(PASSWORD)
+    old = bench('rcon_secure_time_packet',
+                lambda: rcon_secure_time_packet(PASSWORD, COMMAND))
+    new = bench('RconSigner.time_packet',
+                lambda: signer.time_packet(COMMAND))
+    print("speedup: {0:0.2f}x\n".format(old / new))
+
+    old = bench('rcon_secure_challenge_packet',
+                lambda: rcon_secure_challenge_packet(PASSWORD, CHALLENGE,
+                                                     COMMAND))
+    new = bench('RconSigner.challenge_packet',
+                lambda: signer.challenge_packet(CHALLENGE, COMMAND))
+    print("speedup: {0:0.2f}x".format(old / new))
+
+
+if __name__ == '__main__':
+    main()
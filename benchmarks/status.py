@@ -0,0 +1,81 @@
+"""Compares status packet parsers with regex based one they replaced
+
+Run it from repository root:
+
+    $ python benchmarks/status.py
+"""
+import os.path
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from xrcon.utils import (  # NOQA
+    Player, parse_status_packet, StatusResponse, STATUS_RESPONSE_HEADER
+)
+
+
+NUMBER = 5000
+PLAYER_RE = re.compile(
+    br'^(?P<frags>-?\d+) (?P<ping>-?\d+) "(?P<name>.*?)"$')
+SERVER_VARS = b'\\gamename\\Xonotic\\modname\\data\\gameversion\\700' \
+    b'\\sv_maxclients\\32\\clients\\24\\bots\\0\\mapname\\dance' \
+    b'\\hostname\\Xonotic Server\\protocol\\3'
+PACKET = STATUS_RESPONSE_HEADER + SERVER_VARS + b'\n' + b''.join(
+    '{0} {1} "^x555player^7 {2}"\n'.format(i * 7 - 10, i + 40, i).encode()
+    for i in range(24))
+
+
+def parse_player_re(player_data):
+    m = PLAYER_RE.match(player_data)
+    if m is None:
+        raise ValueError('Bad player data')
+
+    return Player.from_dict(m.groupdict())
+
+
+def parse_status_packet_re(status_packet):
+    "Implementation before single pass parser"
+    data = status_packet[len(STATUS_RESPONSE_HEADER):]
+    parts = data.split(b'\n')[:-1]
+    if len(parts) < 1:
+        raise ValueError("Bad packet")
+
+    server_vars, players_dat = parts[0], parts[1:]
+    values = server_vars.split(b'\\')[1:]
+    players = list(parse_player_re(playerd) for playerd in players_dat)
+    return dict(zip(values[::2], values[1::2])), players
+
+
+def bench(name, fun):
+    best = min(timeit.repeat(fun, number=NUMBER, repeat=5))
+    print("{name:<32} {rate:>10.0f} calls/s".format(
+        name=name, rate=NUMBER / best))
+    return best
+
+
+def main():
+    old = bench('regex parser', lambda: parse_status_packet_re(PACKET))
+    new = bench('parse_status_packet', lambda: parse_status_packet(PACKET))
+    print("speedup: {0:0.2f}x".format(old / new))
+    skip = bench('parse_status_packet players=False',
+                 lambda: parse_status_packet(PACKET, players=False))
+    print("speedup: {0:0.2f}x".format(old / skip))
+
+    def lazy():
+        status = StatusResponse(PACKET)
+        return status['sv_maxclients'], status['clients'], status['mapname']
+
+    lazy_time = bench('StatusResponse 3 vars', lazy)
+    print("speedup: {0:0.2f}x".format(old / lazy_time))
+
+    line = PACKET.rsplit(b'\n', 2)[1]
+    old_line = bench('regex player line', lambda: parse_player_re(line))
+    new_line = bench('Player.parse_player',
+                     lambda: Player.parse_player(line))
+    print("speedup: {0:0.2f}x".format(old_line / new_line))
+
+
+if __name__ == '__main__':
+    main()
@@ -16,6 +16,7 @@ tests_require = [
 
 
 if sys.version_info[0] == 2:
+    requires.append('futures')
     tests_require.append('mock')
 
 
@@ -0,0 +1,229 @@
+from .base import TestCase, unittest
+from .library_test import STATUS_PACKET, PARSED_SERVER_VARS
+from xrcon import utils
+from xrcon.client import NotConnected, RttEstimator
+import socket
+import six
+
+
+try:
+    import asyncio
+    from xrcon import aio
+except (ImportError, SyntaxError):  # pragma: no cover
+    aio = None
+
+
+CHALLENGE_RESPONSE = six.b('\xff\xff\xff\xffchallenge 11111111111\x00vle ')
+
+
+class FakeServerProtocol(object):
+    """Fake DarkPlaces server, answers to every rcon command with its text
+    splitted by two packets"""
+
+    def __init__(self):
+        self.received = []
+        self.transport = None
+        self.drop = 0  # number of requests to ignore
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        pass
+
+    def error_received(self, exc):  # pragma: no cover
+        pass
+
+    def reply(self, data, addr):
+        self.transport.sendto(data, addr)
+
+    def datagram_received(self, data, addr):
+        self.received.append(data)
+        if self.drop > 0:
+            self.drop -= 1
+        elif data == utils.CHALLENGE_PACKET:
+            self.reply(CHALLENGE_RESPONSE, addr)
+        elif data == utils.QUAKE_STATUS_PACKET:
+            self.reply(STATUS_PACKET, addr)
+        elif data.startswith(utils.QUAKE_INFO_PACKET + six.b(' ')):
+            challenge = data.split(six.b(' '), 1)[1]
+            self.reply(utils.INFO_RESPONSE_HEADER + six.b('\\mapname\\dm') +
+                       six.b('\\challenge\\') + challenge, addr)
+        elif data == utils.PING_Q2_PACKET:
+            self.reply(utils.PONG_Q2_PACKET, addr)
+        elif data == utils.PING_Q3_PACKET:
+            self.reply(utils.PONG_Q3_PACKET, addr)
+        elif data.startswith(utils.QUAKE_PACKET_HEADER + six.b('rcon ')):
+            command = data.split(six.b(' '), 2)[2]
+            if six.b('\necho ') in command:
+                command, token = command.split(six.b('\necho '))
+                self.reply(utils.RCON_RESPONSE_HEADER + command, addr)
+                self.reply(utils.RCON_RESPONSE_HEADER + token[:3], addr)
+                self.reply(utils.RCON_RESPONSE_HEADER + token[3:] +
+                           six.b('\n'), addr)
+                return
+
+            self.reply(utils.RCON_RESPONSE_HEADER + command[:2], addr)
+            self.reply(utils.RCON_RESPONSE_HEADER + command[2:], addr)
+
+
+@unittest.skipIf(aio is None, "asyncio client requires python 3.6+")
+class AsyncClientTest(TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.transport, self.server = self.run_async(
+            self.loop.create_datagram_endpoint(
+                FakeServerProtocol, local_addr=('127.0.0.1', 0))
+        )
+        self.addCleanup(self.transport.close)
+        self.port = self.transport.get_extra_info('sockname')[1]
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def connect(self, cls, *args, **kwargs):
+        client = cls('127.0.0.1', self.port, *args, **kwargs)
+        self.run_async(client.connect())
+        self.addCleanup(lambda: client.transport and client.close())
+        return client
+
+    def test_not_connected(self):
+        qc = aio.AsyncQuakeProtocol('127.0.0.1', self.port)
+        with self.assertRaises(NotConnected):
+            qc.close()
+
+        with self.assertRaises(NotConnected):
+            self.run_async(qc.getchallenge())
+
+    def test_create_by_server_str(self):
+        rcon = aio.AsyncXRcon.create_by_server_str('127.0.0.1:26006', 'test')
+        self.assertEqual(rcon.host, '127.0.0.1')
+        self.assertEqual(rcon.port, 26006)
+        self.assertEqual(rcon.password, 'test')
+        with self.assertRaises(ValueError):
+            rcon.secure_rcon = 5
+
+    def test_getchallenge(self):
+        qc = self.connect(aio.AsyncQuakeProtocol)
+        self.assertEqual(self.run_async(qc.getchallenge()),
+                         six.b('11111111111'))
+
+    def test_getstatus(self):
+        qc = self.connect(aio.AsyncQuakeProtocol)
+        server_vars, players = self.run_async(qc.getstatus())
+        self.assertEqual(server_vars, PARSED_SERVER_VARS)
+        self.assertEqual(len(players), 7)
+        self.assertEqual(players[2].name, six.b('me'))
+
+    def test_getinfo(self):
+        qc = self.connect(aio.AsyncQuakeProtocol)
+        self.assertEqual(self.run_async(qc.getinfo())[six.b('mapname')],
+                         six.b('dm'))
+
+    def test_ping(self):
+        qc = self.connect(aio.AsyncQuakeProtocol)
+        self.assertGreaterEqual(self.run_async(qc.ping2()), 0)
+        self.assertGreaterEqual(self.run_async(qc.ping3()), 0)
+        self.assertIsNone(self.run_async(qc._ping(six.b('bad'), six.b('x'),
+                                                  timeout=0.1)))
+
+    def test_retransmit(self):
+        qc = self.connect(aio.AsyncQuakeProtocol)
+        qc.rtt = RttEstimator(initial_rto=0.05, min_rto=0.01)
+        self.server.drop = 2
+        self.assertGreaterEqual(self.run_async(qc.ping2()), 0)
+        self.assertEqual(self.server.received, [utils.PING_Q2_PACKET] * 3)
+        self.assertIsNone(qc.rtt.srtt)
+        self.assertAlmostEqual(qc.rtt.rto, 0.2)
+
+        self.assertEqual(self.run_async(qc.getchallenge()),
+                         six.b('11111111111'))
+        self.assertIsNotNone(qc.rtt.srtt)
+
+    def test_read_timeout(self):
+        qc = self.connect(aio.AsyncQuakeProtocol, timeout=0.05)
+        with self.assertRaises(socket.timeout):
+            self.run_async(qc.read_iterator(1).__anext__())
+
+    def test_execute(self):
+        rcon = self.connect(aio.AsyncXRcon, 'passw', 0)
+        data = self.run_async(rcon.execute('status', timeout=0.2))
+        self.assertEqual(data, six.b('status'))
+        self.assertEqual(self.server.received[-1],
+                         utils.rcon_nosecure_packet('passw', 'status'))
+
+        self.run_async(rcon.send('echo'))
+        self.assertEqual(self.run_async(rcon.read_once()), six.b('ec'))
+        self.assertEqual(self.run_async(rcon.read_untill(0.1)), six.b('ho'))
+        self.assertIsNone(self.run_async(rcon.read_untill(0.1)))
+
+    def test_execute_sentinel(self):
+        rcon = self.connect(aio.AsyncXRcon, 'passw', 0, timeout=5)
+        start = self.loop.time()
+        data = self.run_async(rcon.execute('status', timeout=5,
+                                           sentinel=True))
+        self.assertLess(self.loop.time() - start, 1)
+        self.assertEqual(data, six.b('status'))
+
+    def test_stream(self):
+        rcon = self.connect(aio.AsyncXRcon, 'passw', 0, timeout=5)
+        lines = self.collect(rcon.stream('status\nline', timeout=5,
+                                         sentinel=True))
+        self.assertEqual(lines, [six.u('status\n'), six.u('line')])
+
+        lines = self.collect(rcon.stream('one\ntwo', timeout=0.2))
+        self.assertEqual(lines, [six.u('one\n'), six.u('two')])
+
+    def test_send_secure_challenge(self):
+        rcon = self.connect(aio.AsyncXRcon, 'passw', 2)
+        self.run_async(rcon.send('status'))
+        self.run_async(rcon.read_untill(0.1))
+        self.assertEqual(self.server.received[0], utils.CHALLENGE_PACKET)
+        self.assertEqual(
+            self.server.received[1],
+            utils.rcon_secure_challenge_packet('passw', six.b('11111111111'),
+                                               'status')
+        )
+
+        rcon._secure_rcon = -1
+        with self.assertRaises(ValueError):
+            self.run_async(rcon.send('status'))
+
+    def collect(self, agen):
+        results = []
+        while True:
+            try:
+                results.append(self.run_async(agen.__anext__()))
+            except StopAsyncIteration:
+                return results
+
+    def test_execute_many(self):
+        rcons = [aio.AsyncXRcon('127.0.0.1', self.port, 'passw', 0, 0.2)
+                 for i in range(3)]
+        connected = self.connect(aio.AsyncXRcon, 'passw', 0, 0.2)
+        rcons.append(connected)
+        results = self.collect(aio.execute_many(rcons, 'status',
+                                                concurrency=2))
+        self.assertCountEqual([r.rcon for r in results], rcons)
+        for result in results:
+            self.assertEqual(result.output, six.b('status'))
+            self.assertIsNone(result.error)
+            self.assertGreater(result.latency, 0)
+
+        # connected rcon should be left open, others should be closed
+        self.assertIsNotNone(connected.transport)
+        self.assertIsNone(rcons[0].transport)
+
+    def test_iter_execute_many(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(('127.0.0.1', 0))
+        closed_port = sock.getsockname()[1]
+        sock.close()
+
+        rcon = aio.AsyncXRcon('127.0.0.1', closed_port, 'passw', 0)
+        result, = aio.iter_execute_many([rcon], 'status', timeout=0.2)
+        self.assertIs(result.rcon, rcon)
+        self.assertIsNone(result.output)
+        self.assertIsInstance(result.error, socket.error)
@@ -0,0 +1,142 @@
+from .base import TestCase, mock
+from xrcon.cache import StatusCache
+from xrcon.utils import StatusResponse
+from .library_test import STATUS_PACKET
+import socket
+import threading
+
+
+class StatusCacheTest(TestCase):
+
+    def setUp(self):
+        time_patch = mock.patch('xrcon.cache.monotonic_time')
+        self.time_mock = time_patch.start()
+        self.time_mock.return_value = 100.0
+        self.addCleanup(time_patch.stop)
+
+        fetch_patch = mock.patch.object(StatusCache, 'fetch')
+        self.fetch_mock = fetch_patch.start()
+        self.fetch_mock.return_value = STATUS_PACKET
+        self.addCleanup(fetch_patch.stop)
+
+    def test_ttl(self):
+        cache = StatusCache(ttl=5)
+        server = ('server', 26000)
+        self.assertEqual(cache.getstatus_packet(*server), STATUS_PACKET)
+        self.time_mock.return_value = 104.0
+        self.assertEqual(cache.getstatus_packet(*server), STATUS_PACKET)
+        self.assertEqual(self.fetch_mock.call_count, 1)
+        self.assertEqual(len(cache), 1)
+
+        self.time_mock.return_value = 105.0
+        cache.getstatus_packet(*server)
+        self.assertEqual(self.fetch_mock.call_count, 2)
+        cache.getstatus_packet('other', 26000)
+        self.assertEqual(self.fetch_mock.call_count, 3)
+        self.fetch_mock.assert_called_with('other', 26000)
+
+    def test_getstatus(self):
+        cache = StatusCache()
+        server_vars, players = cache.getstatus('server', 26000)
+        self.assertEqual(server_vars[b'mapname'], b'lostspace2')
+        self.assertEqual(len(players), 7)
+        # every caller gets own parsed result
+        self.assertIsNot(cache.getstatus('server', 26000)[1], players)
+        self.assertIsNone(cache.getstatus('server', 26000, False)[1])
+        status = cache.getstatus('server', 26000, lazy=True)
+        self.assertIsInstance(status, StatusResponse)
+        self.assertEqual(self.fetch_mock.call_count, 1)
+
+    def test_errors(self):
+        cache = StatusCache()
+        self.fetch_mock.side_effect = socket.timeout
+        with self.assertRaises(socket.timeout):
+            cache.getstatus_packet('server', 26000)
+
+        self.fetch_mock.side_effect = None
+        self.assertEqual(cache.getstatus_packet('server', 26000),
+                         STATUS_PACKET)
+        self.assertEqual(self.fetch_mock.call_count, 2)
+        self.assertFalse(cache.flights)
+
+    def test_single_flight(self):
+        cache = StatusCache()
+        started = threading.Event()
+        release = threading.Event()
+
+        def fetch(host, port):
+            started.set()
+            release.wait(5)
+            return STATUS_PACKET
+
+        self.fetch_mock.side_effect = fetch
+        results = []
+
+        def worker():
+            results.append(cache.getstatus_packet('server', 26000))
+
+        threads = [threading.Thread(target=worker) for i in range(5)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(results, [STATUS_PACKET] * 5)
+        self.assertEqual(self.fetch_mock.call_count, 1)
+
+    def test_stale_while_revalidate(self):
+        cache = StatusCache(ttl=5, stale_ttl=30)
+        cache.getstatus_packet('server', 26000)
+        self.time_mock.return_value = 110.0
+
+        release = threading.Event()
+
+        def fetch(host, port):
+            release.wait(5)
+            return b'new'
+
+        self.fetch_mock.side_effect = fetch
+        # stale packet is returned without waiting, only one refresh runs
+        self.assertEqual(cache.getstatus_packet('server', 26000),
+                         STATUS_PACKET)
+        flight = cache.flights[('server', 26000)]
+        self.assertEqual(cache.getstatus_packet('server', 26000),
+                         STATUS_PACKET)
+        release.set()
+        flight.event.wait(5)
+        self.assertEqual(cache.getstatus_packet('server', 26000), b'new')
+        self.assertEqual(self.fetch_mock.call_count, 2)
+
+        # too old status is not returned
+        self.fetch_mock.side_effect = None
+        self.time_mock.return_value = 200.0
+        self.assertEqual(cache.getstatus_packet('server', 26000),
+                         STATUS_PACKET)
+
+    def test_evict_expired(self):
+        cache = StatusCache(ttl=5, stale_ttl=30)
+        cache.getstatus_packet('server', 26000)
+        self.time_mock.return_value = 120.0
+        cache.getstatus_packet('other', 26000)
+        self.time_mock.return_value = 130.0
+        self.assertEqual(cache.evict_expired(), 1)
+        self.assertEqual(list(cache.packets), [('other', 26000)])
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+
+class StatusCacheFetchTest(TestCase):
+
+    @mock.patch('xrcon.cache.StatusCache.protocol_class')
+    def test_fetch(self, protocol_mock):
+        qp = protocol_mock.return_value
+        qp.getstatus_packet.return_value = STATUS_PACKET
+        cache = StatusCache(timeout=0.5)
+        self.assertEqual(cache.fetch('server', 26000), STATUS_PACKET)
+        protocol_mock.assert_called_once_with('server', 26000, 0.5)
+        qp.connect.assert_called_once_with()
+        qp.close.assert_called_once_with()
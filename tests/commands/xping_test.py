@@ -130,6 +130,24 @@ class XPingCommandTest(BaseCommandTest):
         with self.assertRaises(ExitException):
             find_server("xonotic.server")
 
+    def test_find_server_resolver(self):
+        xping = XPingProgram()
+        xping.resolver = mock.Mock()
+        xping.resolver.getaddrinfo.return_value = [(
+            socket.AF_INET,
+            socket.SOCK_DGRAM,
+            socket.IPPROTO_UDP,
+            '',
+            ('127.0.0.1', 26000)
+        )]
+        namespace = xping.parser.parse_args(["xonotic.server"])
+        self.assertEqual(xping.find_server(namespace)[4][0], '127.0.0.1')
+        xping.resolver.getaddrinfo.assert_called_once_with(
+            "xonotic.server", 26000, socket.AF_UNSPEC, socket.SOCK_DGRAM,
+            socket.IPPROTO_UDP
+        )
+        self.assertFalse(self.getaddrinfo_mock.called)
+
     def cli_parser_test(self):
 
         def parse_arguments(text):
@@ -1,9 +1,16 @@
-from ..base import mock
+from ..base import mock, unittest
 from .base import BaseCommandTest, ExitException
 from xrcon.commands.xrcon import XRcon, XRconProgram, ConfigParser
 from xrcon.utils import parse_server_addr
 import socket
 import six
+import sys
+
+
+try:
+    from xrcon import aio
+except (ImportError, SyntaxError):  # pragma: no cover
+    aio = None
 
 
 CONFIG_EXAMPLE = """\
@@ -86,10 +93,10 @@ class XRconCommandTest(BaseCommandTest):
 
     def test_simple(self):
         xrcon_mock = self.xrcon_mock
-        xrcon_mock.return_value.execute.return_value = six.b('Result')
+        xrcon_mock.return_value.stream.return_value = [six.u('Result')]
         self.xrcon("-s server -p password -t 2 status".split())
         self.assertTrue(self.read_mock.called)
-        xrcon_mock.return_value.execute.assert_called_once_with('status', 1.2)
+        xrcon_mock.return_value.stream.assert_called_once_with('status', 1.2)
 
         xrcon_mock.create_by_server_str \
             .assert_called_once_with('server', 'password', 2, 1.2)
@@ -97,24 +104,24 @@ class XRconCommandTest(BaseCommandTest):
         xrcon_mock.reset_mock()
         xrcon_mock.create_by_server_str.return_value = xrcon_mock.return_value
         self.xrcon("-n minsta status".split())
-        xrcon_mock.return_value.execute.assert_called_once_with('status', 1.2)
+        xrcon_mock.return_value.stream.assert_called_once_with('status', 1.2)
         xrcon_mock.create_by_server_str \
             .assert_called_once_with('127.0.0.1:26001', 'secret', 0, 1.2)
 
         # test empty
-        xrcon_mock.return_value.execute.return_value = None
+        xrcon_mock.return_value.stream.return_value = []
         self.xrcon("-s server -p password -t 2 empty".split())
 
         # test multiple
-        xrcon_mock.return_value.execute.reset_mock()
+        xrcon_mock.return_value.stream.reset_mock()
         self.xrcon("-s server -p password -t 2 sv_cmd help".split())
-        xrcon_mock.return_value.execute \
+        xrcon_mock.return_value.stream \
             .assert_called_once_with('sv_cmd help', 1.2)
 
     @mock.patch('getpass.getpass')
     def test_config(self, getpass_mock):
         getpass_mock.return_value = six.u('getpass')
-        self.xrcon_mock.return_value.execute.return_value = six.b('Result')
+        self.xrcon_mock.return_value.stream.return_value = [six.u('Result')]
         self.filetype_mock.return_value.return_value = \
             six.StringIO(CONFIG_EXAMPLE2)
         self.xrcon("--config myconfig.ini -s server -t 2 status".split())
@@ -141,3 +148,43 @@ class XRconCommandTest(BaseCommandTest):
         self.xrcon_mock.return_value.connect.side_effect = socket.gaierror
         with self.assertRaises(ExitException):
             self.xrcon("-s badhost -p password status".split())
+
+    @unittest.skipIf(aio is None, "asyncio client requires python 3.6+")
+    @mock.patch('xrcon.aio.iter_execute_many')
+    def test_execute_many(self, execute_many_mock):
+        from xrcon.aio import AsyncXRcon, ExecuteResult
+
+        def iter_execute_many(rcons, command, concurrency):
+            rcons = list(rcons)
+            self.assertEqual(len(rcons), 2)
+            self.assertEqual(command, 'say hi')
+            self.assertEqual(concurrency, 4)
+            yield ExecuteResult(rcons[0], six.b('Result \xff'), 0.02, None)
+            yield ExecuteResult(rcons[1], None, 0.7, socket.timeout())
+
+        execute_many_mock.side_effect = iter_execute_many
+        write_patcher = mock.patch.object(XRconProgram, 'write')
+        write_mock = write_patcher.start()
+        self.addCleanup(write_patcher.stop)
+        self.xrcon("-n minsta -n DEFAULT -j 4 say hi".split())
+        self.assertTrue(execute_many_mock.called)
+        self.assertFalse(self.xrcon_mock.create_by_server_str.called)
+        self.assertEqual(write_mock.call_count, 3)
+        # not utf8 output is decoded with replacement character
+        self.assertEqual(write_mock.call_args_list[1][0][0],
+                         six.u('Result \ufffd'))
+        self.assertIn('error', write_mock.call_args_list[2][0][0])
+        self.assertTrue(all(isinstance(rcon, AsyncXRcon)
+                            for rcon in execute_many_mock.call_args[0][0]))
+
+        with self.assertRaises(ExitException):
+            self.xrcon("-n minsta -n bad_section status".split())
+
+    def test_execute_many_errors(self):
+        with self.assertRaises(ExitException):
+            self.xrcon("-n minsta -n DEFAULT -j 0 status".split())
+
+        # None in sys.modules makes import fail like on old python
+        with mock.patch.dict(sys.modules, {'xrcon.aio': None}):
+            with self.assertRaises(ExitException):
+                self.xrcon("-n minsta -n DEFAULT status".split())
@@ -0,0 +1,78 @@
+from .base import TestCase
+from .library_test import STATUS_PACKET, PARSED_SERVER_VARS
+from xrcon.diff import StatusDiff, StatusEvent, match_players
+from xrcon.utils import Player
+import six
+
+
+b = six.b
+
+
+def players(*data):
+    return [Player(frags, ping, b(name)) for frags, ping, name in data]
+
+
+class StatusDiffTest(TestCase):
+
+    def test_first_update(self):
+        diff = StatusDiff()
+        events = diff.update_packet('srv', STATUS_PACKET)
+        kinds = [event.kind for event in events]
+        self.assertEqual(kinds.count(StatusDiff.VAR), len(PARSED_SERVER_VARS))
+        self.assertEqual(kinds.count(StatusDiff.JOIN), 7)
+        self.assertEqual(len(diff), 1)
+        # same packet is not parsed again
+        self.assertEqual(diff.update_packet('srv', memoryview(STATUS_PACKET)),
+                         [])
+        diff.forget('srv')
+        self.assertEqual(len(diff), 0)
+
+    def test_changes(self):
+        diff = StatusDiff()
+        diff.update('srv', {b('mapname'): b('a'), b('g_x'): b('1')}, players(
+            (1, 50, 'alice'), (2, 60, 'bob'), (0, 70, 'carol')))
+        events = diff.update('srv', {b('mapname'): b('b')}, players(
+            (3, 50, 'alice'), (0, 70, 'dave'), (5, 80, 'eve')))
+
+        self.assertIn(StatusEvent('srv', 'var', b('mapname'), b('a'),
+                                  b('b')), events)
+        self.assertIn(StatusEvent('srv', 'var', b('g_x'), b('1'), None),
+                      events)
+        self.assertIn(StatusEvent('srv', 'frags', b('alice'), 1, 3), events)
+        # carol is renamed to dave in same slot
+        self.assertIn(StatusEvent('srv', 'name', b('dave'), b('carol'),
+                                  b('dave')), events)
+        kinds = dict((event.key, event.kind) for event in events
+                     if event.kind in ('join', 'leave'))
+        self.assertEqual(kinds, {b('bob'): 'leave', b('eve'): 'join'})
+        self.assertEqual(len(events), 6)
+
+        self.assertEqual(diff.update('srv', {b('mapname'): b('b')}, players(
+            (3, 50, 'alice'), (0, 70, 'dave'), (5, 80, 'eve'))), [])
+
+    def test_match_players(self):
+        old = players((1, 10, 'p'), (2, 10, 'p'), (0, 10, 'x'))
+        new = players((2, 20, 'p'), (7, 10, 'y'))
+        matched, renamed, left, joined = match_players(old, new)
+        # same names are matched in slot order
+        self.assertEqual(matched, [(old[0], new[0])])
+        self.assertEqual(renamed, [])
+        self.assertEqual(left, [old[1], old[2]])
+        self.assertEqual(joined, [new[1]])
+
+    def test_leave_and_join_with_same_frags(self):
+        diff = StatusDiff()
+        diff.update('srv', {}, players((0, 50, 'alice'), (5, 60, 'bob')))
+        # alice leaves and carol joins at the end with same score
+        events = diff.update('srv', {}, players((5, 60, 'bob'),
+                                                (0, 70, 'carol')))
+        self.assertEqual(sorted((event.kind, event.key) for event in events),
+                         [('join', b('carol')), ('leave', b('alice'))])
+
+        old = players((-666, 0, 'spec1'), (3, 50, 'p'), (-666, 0, 'spec2'))
+        new = players((3, 50, 'p'), (-666, 0, 'spec3'))
+        matched, renamed, left, joined = match_players(old, new)
+        # spec1 has no matched players before, spec3 has one like spec2
+        self.assertEqual(renamed, [(old[2], new[1])])
+        self.assertEqual(left, [old[0]])
+        self.assertEqual(joined, [])
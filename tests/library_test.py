@@ -5,6 +5,12 @@ import six
 import socket
 
 
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
 b = six.b
 STATUS_PACKET = b(
     '\xff\xff\xff\xffstatusResponse\n\\gamename\\Xonotic\\modname'
@@ -20,6 +26,14 @@ STATUS_PACKET = b(
 )
 
 
+INFO_PACKET = b(
+    '\xff\xff\xff\xffinfoResponse\n\\gamename\\Xonotic\\modname\\data'
+    '\\gameversion\\700\\sv_maxclients\\14\\clients\\12\\bots\\0'
+    '\\mapname\\lostspace2\\hostname\\Xonotic 0.7.0 CTF Server'
+    '\\protocol\\3\\challenge\\abc'
+)
+
+
 PARSED_SERVER_VARS = {
     b('bots'): b('0'),
     b('clients'): b('12'),
@@ -38,6 +52,31 @@ PARSED_SERVER_VARS = {
 }
 
 
+def mock_recv(sock_mock, packets):
+    "Feed packets to both recv and recv_into methods of socket mock"
+    if not isinstance(packets, list):
+        packets = [packets]
+
+    packets = iter(packets)
+
+    def next_packet():
+        packet = next(packets)
+        if not isinstance(packet, six.binary_type):
+            raise packet
+        return packet
+
+    def recv(size):
+        return next_packet()[:size]
+
+    def recv_into(buffer, nbytes=0):
+        packet = next_packet()
+        buffer[:len(packet)] = packet
+        return len(packet)
+
+    sock_mock.recv.side_effect = recv
+    sock_mock.recv_into.side_effect = recv_into
+
+
 class UtilsTest(TestCase):
 
     def test_rcon_nosecure_packet(self):
@@ -76,6 +115,56 @@ class UtilsTest(TestCase):
                   '\x05T\x12 11111111111 status')
         )
 
+    @mock.patch('time.time')
+    def test_rcon_signer(self, time_mock):
+        time_mock.return_value = 100.0
+        signer = utils.RconSigner('passw')
+        self.assertEqual(signer.time_packet('status'),
+                         utils.rcon_secure_time_packet('passw', 'status'))
+        self.assertEqual(
+            signer.challenge_packet(six.b('11111111111'), 'status'),
+            utils.rcon_secure_challenge_packet('passw', six.b('11111111111'),
+                                               'status'))
+        # copied state is used, so signing is repeatable
+        self.assertEqual(signer.sign(b('msg')), signer.sign(b('msg')))
+        self.assertEqual(signer.sign(b('msg')),
+                         utils.hmac_md4('passw', 'msg').digest())
+
+    @mock.patch('time.time')
+    def test_rcon_signer_batch(self, time_mock):
+        time_mock.return_value = 100.0
+        signer = utils.RconSigner('passw')
+        self.assertEqual(signer.sign_many([b('msg'), b('other')]),
+                         [signer.sign(b('msg')), signer.sign(b('other'))])
+        self.assertEqual(signer.time_packets(['status', 'echo 1']),
+                         [signer.time_packet('status'),
+                          signer.time_packet('echo 1')])
+        self.assertEqual(signer.time_packets([]), [])
+
+    def test_command_separator(self):
+        self.assertEqual(utils.command_separator('set a 1'), ';')
+        self.assertEqual(utils.command_separator('say "a;b"'), ';')
+        self.assertEqual(utils.command_separator('say "a;b'), '\n')
+        self.assertEqual(utils.command_separator(b('say \\"a')), ';')
+        self.assertEqual(utils.command_separator('say a // c'), '\n')
+        self.assertEqual(utils.command_separator('say "a // c"'), ';')
+
+    def test_pack_commands(self):
+        self.assertEqual(
+            utils.pack_commands(['set a 1', 'say "x', 'set b 2'], 100),
+            ['set a 1;say "x\nset b 2'])
+        self.assertEqual(
+            utils.pack_commands([b('set a 1'), b('set b 2'), b('set c 3'),
+                                 b('set dd 4')], 16),
+            [b('set a 1;set b 2'), b('set c 3;set dd 4')])
+        self.assertEqual(utils.pack_commands([], 16), [])
+        # size is counted in bytes
+        self.assertEqual(
+            utils.pack_commands([six.u('say \xe9'), six.u('say \xe9')], 12),
+            [six.u('say \xe9'), six.u('say \xe9')])
+        with self.assertRaises(ValueError):
+            utils.pack_commands(['set a 1', 'x' * 17], 16)
+
     def test_parse_challenge_response(self):
         challenge_resp = six.b(
             '\xff\xff\xff\xffchallenge 11111111111\x00vlen.'
@@ -93,6 +182,35 @@ class UtilsTest(TestCase):
             six.b('Test')
         )
 
+        view = memoryview(six.b('\xFF\xFF\xFF\xFFnTest'))
+        self.assertTrue(utils.packet_startswith(view,
+                                                utils.RCON_RESPONSE_HEADER))
+        response = utils.parse_rcon_response(view)
+        self.assertIsInstance(response, memoryview)
+        self.assertEqual(response.tobytes(), six.b('Test'))
+
+    def test_sentinel(self):
+        token = utils.make_sentinel()
+        self.assertNotEqual(token, utils.make_sentinel())
+        self.assertEqual(utils.append_sentinel(six.u('status'), b('tok')),
+                         six.u('status\necho tok'))
+        self.assertEqual(utils.append_sentinel(b('status'), b('tok')),
+                         b('status\necho tok'))
+        self.assertEqual(utils.strip_sentinel(b('out\ntok\n'), b('tok')),
+                         (b('out\n'), True))
+        self.assertEqual(utils.strip_sentinel(b('out\n'), b('tok')),
+                         (b('out\n'), False))
+
+    def test_line_decoder(self):
+        decoder = utils.LineDecoder()
+        self.assertEqual(decoder.feed(b('one\ntw')), [six.u('one\n')])
+        # multibyte character is splitted between chunks
+        self.assertEqual(decoder.feed(b('o \xc3')), [])
+        self.assertEqual(decoder.feed(memoryview(b('\x89\nthree'))),
+                         [six.u('two \xc9\n')])
+        self.assertEqual(decoder.flush(), six.u('three'))
+        self.assertEqual(decoder.flush(), six.u(''))
+
     def test_parse_server_addr(self):
         self.assertEqual(
             utils.parse_server_addr('hostname', default_port=1234),
@@ -135,12 +253,24 @@ class UtilsTest(TestCase):
             # bad data
             utils.Player.parse_player(six.b('666 5 "Player'))
 
+        player3 = utils.Player.parse_player(six.b('1 -2 "a "b" c"\n'))
+        self.assertEqual((player3.frags, player3.ping, player3.name),
+                         (1, -2, six.b('a "b" c')))
+        for data in ['1 2', '1 2 "', '1  2 "a"', '+1 2 "a"', '1_0 2 "a"',
+                     '1 2 "a"b', '1 2 "a\nb"', '- 2 "a"', '']:
+            with self.assertRaises(ValueError):
+                utils.Player.parse_player(six.b(data))
+
     def test_parse_status_response(self):
 
         server_vars, players = utils.parse_status_packet(STATUS_PACKET)
         self.assertEqual(server_vars, PARSED_SERVER_VARS)
         self.assertEqual(len(players), 7)
         self.assertEqual(players[2].name, six.b('me'))
+        server_vars, players = utils.parse_status_packet(
+            memoryview(STATUS_PACKET))
+        self.assertEqual(server_vars, PARSED_SERVER_VARS)
+        self.assertEqual(len(players), 7)
         # test repr not raises errors
         players_r = repr(players)
         self.assertIsNotNone(players_r)
@@ -148,6 +278,107 @@ class UtilsTest(TestCase):
         with self.assertRaises(ValueError):
             utils.parse_status_packet(b('BAD DATA' * 40))
 
+        server_vars, players = utils.parse_status_packet(STATUS_PACKET,
+                                                         players=False)
+        self.assertEqual(server_vars, PARSED_SERVER_VARS)
+        self.assertIsNone(players)
+        # incomplete last line is ignored
+        server_vars, players = utils.parse_status_packet(
+            utils.STATUS_RESPONSE_HEADER + b('\\a\\1\n1 2 "x"\n3 4'))
+        self.assertEqual(server_vars, {b('a'): b('1')})
+        self.assertEqual(len(players), 1)
+
+    def test_status_response(self):
+        status = utils.StatusResponse(memoryview(STATUS_PACKET))
+        self.assertEqual(status['mapname'], b('lostspace2'))
+        self.assertEqual(status[b('clients')], b('12'))
+        self.assertIn('sv_maxclients', status)
+        self.assertNotIn('unknown', status)
+        self.assertEqual(status.get('unknown', 1), 1)
+        with self.assertRaises(KeyError):
+            status['unknown']
+
+        for key, value in PARSED_SERVER_VARS.items():
+            self.assertEqual(status[key], value)
+
+        self.assertEqual(status.server_vars, PARSED_SERVER_VARS)
+        self.assertEqual(status.player_count, 7)
+        players = list(status)
+        self.assertEqual(len(players), 7)
+        self.assertEqual(players[2].name, b('me'))
+        self.assertEqual(repr(status),
+                         '<StatusResponse(11 vars, 7 players)>')
+
+        # key which is also value
+        status = utils.StatusResponse(
+            utils.STATUS_RESPONSE_HEADER + b('\\a\\b\\b\\c\\d\\\n'))
+        self.assertEqual(status['b'], b('c'))
+        self.assertEqual(status['d'], b(''))
+        self.assertNotIn('c', status)
+        self.assertEqual(list(status), [])
+
+        with self.assertRaises(ValueError):
+            utils.StatusResponse(b('BAD DATA' * 40))
+
+        with self.assertRaises(ValueError):
+            utils.StatusResponse(utils.STATUS_RESPONSE_HEADER + b('a\\b\n'))
+
+    def test_player_table(self):
+        server_vars, table = utils.parse_status_packet(STATUS_PACKET,
+                                                       columnar=True)
+        self.assertEqual(server_vars, PARSED_SERVER_VARS)
+        self.assertIsInstance(table, utils.PlayerTable)
+        self.assertEqual(len(table), 7)
+        self.assertEqual(list(table.frags), [57, 319, -666, 14, 130, 98, 56])
+        self.assertEqual(table.name(2), b('me'))
+        self.assertEqual(table[-1].name, b('^x940S^x720Weed^x530^7'))
+        self.assertEqual([player.ping for player in table],
+                         [72, 116, 41, 53, 66, 33, 49])
+        with self.assertRaises(IndexError):
+            table[7]
+
+        other = utils.PlayerTable()
+        other.append(1, 2, b('x'))
+        other.extend(table)
+        self.assertEqual(len(other), 8)
+        self.assertEqual(other.name(0), b('x'))
+        self.assertEqual(other.name(3), b('me'))
+        self.assertEqual(other[7].name, table[6].name)
+        self.assertEqual(repr(other), '<PlayerTable(8 players)>')
+
+        with self.assertRaises(ValueError):
+            utils.PlayerTable.from_lines([b('1 2 "a"'), b('bad')])
+
+    @unittest.skipIf(numpy is None, "requires numpy")
+    def test_player_table_numpy(self):  # pragma: no cover
+        _, table = utils.parse_status_packet(STATUS_PACKET, columnar=True)
+        arrays = table.to_numpy()
+        self.assertEqual(arrays['frags'].sum(), sum(table.frags))
+        self.assertEqual(arrays['pings'].max(), 116)
+        offsets = arrays['offsets']
+        self.assertEqual(arrays['names'][offsets[2]:offsets[3]].tobytes(),
+                         b('me'))
+        # arrays share memory with table
+        arrays['frags'][0] = 1
+        self.assertEqual(table.frags[0], 1)
+
+    def test_parse_info_packet(self):
+        server_vars = utils.parse_info_packet(INFO_PACKET)
+        self.assertEqual(server_vars[b('mapname')], b('lostspace2'))
+        self.assertEqual(server_vars[b('challenge')], b('abc'))
+        self.assertEqual(utils.parse_info_packet(memoryview(INFO_PACKET),
+                                                 b('abc')), server_vars)
+        with self.assertRaises(ValueError):
+            utils.parse_info_packet(INFO_PACKET, b('other'))
+
+        self.assertTrue(utils.is_info_response(INFO_PACKET, b('abc')))
+        self.assertFalse(utils.is_info_response(INFO_PACKET, b('other')))
+        self.assertFalse(utils.is_info_response(STATUS_PACKET, b('abc')))
+        self.assertEqual(utils.info_packet(b('abc')),
+                         b('\xff\xff\xff\xffgetinfo abc'))
+        self.assertEqual(utils.info_packet(), utils.QUAKE_INFO_PACKET)
+        self.assertEqual(len(utils.make_query_challenge()), 12)
+
     def test_parse_servers_response(self):
         good_packet = six.b(
             '\xff\xff\xff\xffgetserversResponse'
@@ -179,6 +410,34 @@ class UtilsTest(TestCase):
         with self.assertRaises(ValueError):
             list(utils.parse_servers_response(bad_packet2))
 
+        self.assertEqual(
+            utils.parse_servers_response(good_packet, packed=True)[0],
+            (0x82953716, 26045))
+
+    def test_parse_servers_response_ext(self):
+        packet = six.b(
+            '\xff\xff\xff\xffgetserversExtResponse'
+            '\\\x82\x957\x16e\xbd'
+            '/\x20\x01\x0d\xb8' + '\x00' * 11 + '\x01e\x90'
+            '/\x20\x01\x0d\xb8' + '\x00' * 11 + '\x02e\x90'
+            '\\zcv\x05e\x91'
+            '\\EOF\x00\x00\x00'
+        )
+        self.assertEqual(utils.parse_servers_response(memoryview(packet)), [
+            ('130.149.55.22', 26045),
+            ('2001:db8::1', 26000),
+            ('2001:db8::2', 26000),
+            ('122.99.118.5', 26001)
+        ])
+        self.assertEqual(utils.parse_servers_response(packet, True)[1:3], [
+            (0x20010db8 << 96 | 1, 26000),
+            (0x20010db8 << 96 | 2, 26000)
+        ])
+
+        with self.assertRaises(ValueError):
+            # truncated IPv6 entry
+            utils.parse_servers_response(packet[:-20] + packet[-7:])
+
 
 class QuakeProtocolTest(TestCase):
 
@@ -213,63 +472,161 @@ class QuakeProtocolTest(TestCase):
 
     @mock.patch('socket.socket', spec=socket.socket)
     def test_client_getchallenge(self, socket_mock):
-        socket_mock.return_value.recv.side_effect = [
+        mock_recv(socket_mock.return_value, [
             six.b('\xFF\xFF\xFF\xFFBAD PACKET'),
             six.b('\xff\xff\xff\xffchallenge 11111111111\x00vle ')
-        ]
+        ])
         qc = client.QuakeProtocol('127.0.0.1', 26000)
         qc.connect()
         challenge = qc.getchallenge()
         self.assertEqual(challenge, six.b('11111111111'))
         qc.close()
 
-    @mock.patch('time.time')
+    @mock.patch('xrcon.client.monotonic_time')
     @mock.patch('socket.socket', spec=socket.socket)
     def test_client_getchallenge_timeout(self, socket_mock, time_mock):
         time_mock.return_value = 100.0
 
-        def recv(num):
+        def recv_into(buffer, nbytes=0):
             time_mock.return_value += 20
-            return six.b('\xFF\xFF\xFF\xFFBAD PACKET')
+            packet = six.b('\xFF\xFF\xFF\xFFBAD PACKET')
+            buffer[:len(packet)] = packet
+            return len(packet)
 
-        socket_mock.return_value.recv.side_effect = recv
+        socket_mock.return_value.recv_into.side_effect = recv_into
         qc = client.QuakeProtocol('127.0.0.1', 26000)
         qc.connect()
         with self.assertRaises(socket.timeout):
             qc.getchallenge()
 
-    @mock.patch('time.time')
+    @mock.patch('xrcon.client.monotonic_time')
+    @mock.patch('socket.socket', spec=socket.socket)
+    def test_read_iterator_deadline(self, socket_mock, time_mock):
+        time_mock.side_effect = [100.0, 100.0, 102.8, 103.0]
+        socket_mock.return_value.recv.return_value = six.b('packet')
+        qc = client.QuakeProtocol('127.0.0.1', 26000, timeout=0.7)
+        qc.connect()
+        socket_mock.return_value.settimeout.reset_mock()
+        packets = qc.read_iterator(3)
+        self.assertEqual(next(packets), six.b('packet'))
+        self.assertEqual(next(packets), six.b('packet'))
+        with self.assertRaises(socket.timeout):
+            next(packets)
+
+        timeouts = [call[0][0] for call in
+                    socket_mock.return_value.settimeout.call_args_list]
+        self.assertEqual(len(timeouts), 2)
+        self.assertAlmostEqual(timeouts[0], 0.7)
+        self.assertAlmostEqual(timeouts[1], 0.2)
+
+    @mock.patch('xrcon.client.monotonic_time')
     @mock.patch('socket.socket', spec=socket.socket)
     def test_ping(self, socket_mock, time_mock):
-        time_mock.side_effect = [100.0, 100.02]
+        time_mock.return_value = 100.0
+        sock = socket_mock.return_value
+
+        def pong(packet, rtt):
+            def recv_into(buffer, nbytes=0):
+                time_mock.return_value += rtt
+                buffer[:len(packet)] = packet
+                return len(packet)
+            return recv_into
+
         qc = client.QuakeProtocol('127.0.0.1', 26000)
-        qc.read_iterator = mock.MagicMock()
-        qc.read_iterator.return_value = iter([utils.PONG_Q2_PACKET])
         qc.connect()
+        sock.recv_into.side_effect = pong(utils.PONG_Q2_PACKET, 0.02)
         self.assertAlmostEqual(qc.ping2(), 0.02)
-        socket_mock.return_value \
-            .send.assert_called_once_with(utils.PING_Q2_PACKET)
-
-        socket_mock.reset_mock()
-        qc.read_iterator.reset_mock()
-        qc.read_iterator.side_effect = socket.timeout
-        time_mock.side_effect = [100.0]
-        self.assertIsNone(qc.ping2())
-
-        socket_mock.reset_mock()
-        qc.read_iterator.side_effect = None
-        time_mock.side_effect = [100.0, 100.03]
-        qc.read_iterator.return_value = iter([utils.PONG_Q3_PACKET])
+        sock.send.assert_called_once_with(utils.PING_Q2_PACKET)
+        self.assertAlmostEqual(qc.rtt.srtt, 0.02)
+
+        sock.reset_mock()
+        sock.recv_into.side_effect = pong(utils.PONG_Q3_PACKET, 0.03)
         self.assertAlmostEqual(qc.ping3(), 0.03)
-        socket_mock.return_value \
-            .send.assert_called_once_with(utils.PING_Q3_PACKET)
+        sock.send.assert_called_once_with(utils.PING_Q3_PACKET)
+
+        sock.reset_mock()
+        sock.recv_into.side_effect = socket.timeout
+        self.assertIsNone(qc.ping2(0))
+        qc.close()
+
+    @mock.patch('xrcon.client.monotonic_time')
+    @mock.patch('socket.socket', spec=socket.socket)
+    def test_request_retransmit(self, socket_mock, time_mock):
+        time_mock.return_value = 100.0
+        sock = socket_mock.return_value
+        responses = [None] * 5 + [utils.PONG_Q2_PACKET]
+
+        def recv_into(buffer, nbytes=0):
+            packet = responses.pop(0)
+            if packet is None:
+                # packet lost, whole read timeout is spent
+                time_mock.return_value += sock.settimeout.call_args[0][0]
+                raise socket.timeout
+
+            time_mock.return_value += 0.01
+            buffer[:len(packet)] = packet
+            return len(packet)
+
+        sock.recv_into.side_effect = recv_into
+        qc = client.QuakeProtocol('127.0.0.1', 26000)
+        qc.connect()
+        self.assertAlmostEqual(qc.ping2(timeout=5), 0.01)
+        self.assertEqual(sock.send.call_count, 3)
+        timeouts = [call[0][0] for call in sock.settimeout.call_args_list]
+        # every wait is limited by socket timeout
+        self.assertEqual([round(t, 3) for t in timeouts[1:]],
+                         [0.7, 0.3, 0.7, 0.7, 0.6, 0.7])
+        # rto is doubled after every loss and sample of retransmitted
+        # request is ignored
+        self.assertEqual(qc.rtt.rto, 3.0)
+        self.assertIsNone(qc.rtt.srtt)
+
+        sock.reset_mock()
+        responses[:] = [None] * 10
+        with self.assertRaises(socket.timeout):
+            qc.getchallenge()
+        self.assertEqual(sock.send.call_count, 1)
+        self.assertAlmostEqual(time_mock.return_value, 103.01 + 3)
+        qc.close()
+
+    def test_rtt_estimator(self):
+        rtt = client.RttEstimator(initial_rto=1.0, min_rto=0.1, max_rto=3.0)
+        self.assertEqual(rtt.rto, 1.0)
+        self.assertAlmostEqual(rtt.update(0.2), 0.6)
+        self.assertAlmostEqual(rtt.srtt, 0.2)
+        self.assertAlmostEqual(rtt.rttvar, 0.1)
+        rtt.update(0.2)
+        self.assertAlmostEqual(rtt.rttvar, 0.075)
+        self.assertAlmostEqual(rtt.rto, 0.5)
+        for i in range(50):
+            rtt.update(0.001)
+
+        self.assertEqual(rtt.rto, 0.1)
+        self.assertEqual(rtt.backoff(), 0.2)
+        rtt.update(10)
+        self.assertEqual(rtt.rto, 3.0)
+        self.assertEqual(rtt.backoff(), 3.0)
+
+    @mock.patch('xrcon.client.make_query_challenge')
+    @mock.patch('socket.socket', spec=socket.socket)
+    def test_getinfo(self, socket_mock, challenge_mock):
+        challenge_mock.return_value = b('abc')
+        stale = INFO_PACKET.replace(b('\\challenge\\abc'),
+                                    b('\\challenge\\old'))
+        mock_recv(socket_mock.return_value, [stale, INFO_PACKET])
+        qc = client.QuakeProtocol('127.0.0.1', 26000)
+        qc.connect()
+        server_vars = qc.getinfo()
+        self.assertEqual(server_vars[b('hostname')],
+                         b('Xonotic 0.7.0 CTF Server'))
+        socket_mock.return_value.send.assert_called_once_with(
+            b('\xff\xff\xff\xffgetinfo abc'))
         qc.close()
 
     @mock.patch('socket.socket', spec=socket.socket)
     def test_getstatus(self, socket_mock):
+        mock_recv(socket_mock.return_value, [STATUS_PACKET])
         qc = client.QuakeProtocol('127.0.0.1', 26000)
-        qc.read_iterator = mock.MagicMock()
-        qc.read_iterator.return_value = iter([STATUS_PACKET])
         qc.connect()
         server_vars, players = qc.getstatus()
         self.assertEqual(server_vars, PARSED_SERVER_VARS)
@@ -278,13 +635,26 @@ class QuakeProtocolTest(TestCase):
         socket_mock.return_value.send \
             .assert_called_once_with(utils.QUAKE_STATUS_PACKET)
 
-        qc.read_iterator.return_value = iter([])
-        self.assertIsNone(qc.getstatus())
+        mock_recv(socket_mock.return_value, [STATUS_PACKET])
+        status = qc.getstatus(lazy=True)
+        self.assertEqual(status['mapname'], b('lostspace2'))
         qc.close()
 
 
 class ClientTest(TestCase):
 
+    @mock.patch('xrcon.client.RconSigner')
+    def test_client_signer(self, signer_mock):
+        rcon = client.XRcon('localhost', 26000, 'passw')
+        self.assertIs(rcon.signer, signer_mock.return_value)
+        self.assertIs(rcon.signer, signer_mock.return_value)
+        signer_mock.assert_called_once_with('passw')
+        rcon.password = 'other'
+        self.assertEqual(rcon.password, 'other')
+        rcon.signer
+        signer_mock.assert_called_with('other')
+        self.assertEqual(signer_mock.call_count, 2)
+
     def test_validate_secure_rcon(self):
         with self.assertRaises(ValueError):
             client.XRcon('localhost', 26000, 'passw', 4)
@@ -344,8 +714,7 @@ class ClientTest(TestCase):
 
     @mock.patch('socket.socket', spec=socket.socket)
     def test_client_read_once(self, socket_mock):
-        socket_mock.return_value.recv.return_value = \
-            six.b('\xFF\xFF\xFF\xFFnTest')
+        mock_recv(socket_mock.return_value, six.b('\xFF\xFF\xFF\xFFnTest'))
 
         rcon = client.XRcon('127.0.0.1', 26000, 'passw')
         rcon.connect()
@@ -354,15 +723,163 @@ class ClientTest(TestCase):
 
     @mock.patch('socket.socket', spec=socket.socket)
     def test_client_execute(self, socket_mock):
-        socket_mock.return_value.recv.side_effect = [
+        mock_recv(socket_mock.return_value, [
             six.b('\xFF\xFF\xFF\xFFn1'),
             six.b('\xFF\xFF\xFF\xFFn2'),
             six.b('\xFF\xFF\xFF\xFFn3'),
             socket.timeout
-        ]
+        ])
 
         rcon = client.XRcon('127.0.0.1', 26000, 'passw')
         rcon.connect()
         data = rcon.execute('status')
         self.assertEqual(data, six.b('123'))
         rcon.close()
+
+    @mock.patch('xrcon.client.make_sentinel')
+    @mock.patch('socket.socket', spec=socket.socket)
+    def test_client_execute_sentinel(self, socket_mock, sentinel_mock):
+        sentinel_mock.return_value = six.b('xrcon_tok')
+        mock_recv(socket_mock.return_value, [
+            six.b('\xFF\xFF\xFF\xFFn1\n'),
+            six.b('\xFF\xFF\xFF\xFFnxrcon_'),
+            six.b('\xFF\xFF\xFF\xFFntok\n'),
+            six.b('\xFF\xFF\xFF\xFFnnot read'),
+        ])
+
+        rcon = client.XRcon('127.0.0.1', 26000, 'passw', 0)
+        rcon.connect()
+        data = rcon.execute('status', sentinel=True)
+        self.assertEqual(data, six.b('1\n'))
+        socket_mock.return_value.send.assert_called_once_with(
+            six.b('\xFF\xFF\xFF\xFFrcon passw status\necho xrcon_tok'))
+
+        mock_recv(socket_mock.return_value, [
+            six.b('\xFF\xFF\xFF\xFFnxrcon_tok\n')
+        ])
+        self.assertIsNone(rcon.execute('empty', sentinel=True))
+
+        mock_recv(socket_mock.return_value, socket.timeout())
+        self.assertIsNone(rcon.execute('lost', sentinel=True))
+        rcon.close()
+
+    @mock.patch('xrcon.client.make_sentinel')
+    @mock.patch('socket.socket', spec=socket.socket)
+    def test_client_execute_batch(self, socket_mock, sentinel_mock):
+        sentinel_mock.return_value = six.b('xrcon_tok')
+        sock = socket_mock.return_value
+        mock_recv(sock, [
+            six.b('\xFF\xFF\xFF\xFFn1\n'),
+            six.b('\xFF\xFF\xFF\xFFn2\nxrcon_tok\n'),
+        ])
+
+        rcon = client.XRcon('127.0.0.1', 26000, 'passw', 0)
+        rcon.connect()
+        size = utils.MAX_PACKET_SIZE - len(
+            utils.rcon_nosecure_packet('passw', ''))
+        self.assertEqual(rcon.max_command_size(), size)
+        commands = ['set a{0} {1}'.format(i, 'x' * 100) for i in range(20)]
+        data = rcon.execute_batch(commands, sentinel=True)
+        self.assertEqual(data, six.b('1\n2\n'))
+        packets = [call[0][0] for call in sock.send.call_args_list]
+        self.assertEqual(len(packets), 2)
+        self.assertTrue(all(len(packet) <= utils.MAX_PACKET_SIZE
+                            for packet in packets))
+        self.assertTrue(packets[1].endswith(six.b(';echo xrcon_tok')))
+
+        sock.send.reset_mock()
+        mock_recv(sock, [six.b('\xFF\xFF\xFF\xFFnok'), socket.timeout])
+        rcon.secure_rcon = 1
+        self.assertEqual(rcon.execute_batch(['set a 1', 'set b 2']),
+                         six.b('ok'))
+        self.assertEqual(sock.send.call_count, 1)
+        self.assertLessEqual(rcon.max_command_size(),
+                             utils.MAX_PACKET_SIZE - 40)
+        rcon.secure_rcon = 2
+        self.assertLessEqual(rcon.max_command_size(),
+                             utils.MAX_PACKET_SIZE - 50)
+        rcon.close()
+
+    @mock.patch('socket.socket', spec=socket.socket)
+    def test_client_execute_batch_challenge(self, socket_mock):
+        sock = socket_mock.return_value
+        challenge = six.b('\xFF\xFF\xFF\xFFchallenge 11111111111')
+        # output of sent packets arrives while next challenges are waited
+        mock_recv(sock, [
+            challenge,
+            six.b('\xFF\xFF\xFF\xFFnchunk1\n'),
+            challenge,
+            six.b('\xFF\xFF\xFF\xFFnchunk2\n'),
+            challenge,
+            six.b('\xFF\xFF\xFF\xFFnchunk3\n'),
+            socket.timeout
+        ])
+
+        rcon = client.XRcon('127.0.0.1', 26000, 'passw', 2)
+        rcon.connect()
+        commands = ['set a{0} {1}'.format(i, 'x' * 60) for i in range(50)]
+        self.assertEqual(rcon.execute_batch(commands),
+                         six.b('chunk1\nchunk2\nchunk3\n'))
+        packets = [call[0][0] for call in sock.send.call_args_list]
+        self.assertEqual(packets.count(utils.CHALLENGE_PACKET), 3)
+        self.assertEqual(len(packets), 6)
+        rcon.close()
+
+    @mock.patch('xrcon.client.monotonic_time')
+    def test_challenge_pool(self, time_mock):
+        time_mock.return_value = 100.0
+        pool = client.ChallengePool(size=2, ttl=5)
+        self.assertEqual(pool.wanted(), 2)
+        pool.pending = 2
+        pool.put(six.b('1'))
+        pool.put(six.b('2'))
+        pool.put(six.b('3'))
+        self.assertEqual(len(pool), 2)
+        self.assertEqual(pool.pending, 0)
+        self.assertEqual(pool.wanted(), 0)
+        self.assertEqual(pool.get(), six.b('2'))
+        time_mock.return_value = 106.0
+        self.assertIsNone(pool.get())
+        self.assertEqual(len(pool), 0)
+
+        # darkplaces repeats challenge until it is used
+        pool.put(six.b('4'))
+        pool.put(six.b('4'))
+        self.assertEqual(len(pool), 1)
+        self.assertEqual(pool.get(), six.b('4'))
+        self.assertIsNone(pool.get())
+
+    @mock.patch('xrcon.client.RconSigner')
+    @mock.patch('socket.socket', spec=socket.socket)
+    def test_client_challenge_prefetch(self, socket_mock, signer_mock):
+        signer_mock.return_value.challenge_packet.side_effect = \
+            lambda challenge, command: \
+            six.b(' ').join([challenge, six.b(command)])
+        sock = socket_mock.return_value
+        mock_recv(sock, [
+            six.b('\xff\xff\xff\xffchallenge 11111111111\x00vle '),
+            six.b('\xFF\xFF\xFF\xFFnout1'),
+            six.b('\xff\xff\xff\xffchallenge 22222222222\x00vle '),
+            six.b('\xFF\xFF\xFF\xFFnout2'),
+            socket.timeout,
+            six.b('\xFF\xFF\xFF\xFFnout3'),
+            socket.timeout
+        ])
+
+        rcon = client.XRcon('127.0.0.1', 26000, 'passw', 2,
+                            challenge_pool=client.ChallengePool())
+        rcon.connect()
+        self.assertEqual(rcon.execute('cmd1'), six.b('out1out2'))
+        self.assertEqual(rcon.challenge_pool.pending, 0)
+        self.assertEqual(len(rcon.challenge_pool), 1)
+        self.assertEqual(rcon.execute('cmd2'), six.b('out3'))
+        sent = [call[0][0] for call in sock.send.call_args_list]
+        self.assertEqual(sent, [
+            utils.CHALLENGE_PACKET,
+            six.b('11111111111 cmd1'),
+            utils.CHALLENGE_PACKET,
+            six.b('22222222222 cmd2'),
+            utils.CHALLENGE_PACKET,
+        ])
+        rcon.close()
+        self.assertEqual(rcon.challenge_pool.pending, 0)
@@ -0,0 +1,135 @@
+from .base import TestCase, mock
+from xrcon import utils
+from xrcon.master import MasterQuery, query_masters
+import threading
+import struct
+import socket
+import six
+
+
+def servers_packet(servers, end=utils.MASTER_EOT,
+                   header=utils.MASTER_RESPONSE_HEADER):
+    data = [header]
+    for ip, port in servers:
+        if ':' in ip:
+            data.append(six.b('/') + socket.inet_pton(socket.AF_INET6, ip))
+        else:
+            data.append(six.b('\\') + socket.inet_aton(ip))
+        data.append(struct.pack('>H', port))
+
+    data.append(end)
+    return six.b('').join(data)
+
+
+class FakeMaster(object):
+
+    def __init__(self, replies):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.port = self.sock.getsockname()[1]
+        self.replies = replies
+        self.requests = []
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.daemon = True
+        self.thread.start()
+
+    @property
+    def addr(self):
+        return '127.0.0.1:{0}'.format(self.port)
+
+    def serve(self):
+        try:
+            while True:
+                data, addr = self.sock.recvfrom(utils.MAX_PACKET_SIZE)
+                self.requests.append(data)
+                for reply in self.replies:
+                    self.sock.sendto(reply, addr)
+        except socket.error:
+            pass
+
+    def close(self):
+        self.sock.close()
+
+
+class MasterResponseTest(TestCase):
+
+    def test_getservers_packet(self):
+        self.assertEqual(utils.getservers_packet('Xonotic', 3),
+                         six.b('\xff\xff\xff\xffgetservers Xonotic 3 empty '
+                               'full'))
+        self.assertEqual(
+            utils.getservers_packet('Xonotic', 3, ('ipv6',), ext=True),
+            six.b('\xff\xff\xff\xffgetserversExt Xonotic 3 ipv6'))
+
+    def test_parse_master_response(self):
+        servers = [('130.149.55.22', 26045), ('2001:db8::1', 26000),
+                   ('122.99.118.5', 26001)]
+        packet = servers_packet(servers,
+                                header=utils.MASTER_EXT_RESPONSE_HEADER)
+        self.assertEqual(utils.parse_master_response(packet),
+                         (servers, True))
+        self.assertEqual(
+            utils.parse_master_response(memoryview(servers_packet(
+                servers[:1], utils.MASTER_EOF))),
+            (servers[:1], False))
+        self.assertEqual(
+            utils.parse_master_response(servers_packet([], six.b(''))),
+            ([], False))
+
+        for bad_packet in [six.b('\xff\xff\xff\xffstatusResponse\n'),
+                           utils.MASTER_RESPONSE_HEADER + six.b('tzcv\x05e'),
+                           utils.MASTER_RESPONSE_HEADER + six.b('/abc\x00')]:
+            with self.assertRaises(ValueError):
+                utils.parse_master_response(bad_packet)
+
+
+class MasterQueryTest(TestCase):
+
+    def make_master(self, replies):
+        master = FakeMaster(replies)
+        self.addCleanup(master.close)
+        return master
+
+    def test_query(self):
+        master1 = self.make_master([
+            servers_packet([('1.2.3.4', 26000), ('1.2.3.5', 26000)],
+                           utils.MASTER_EOF),
+            servers_packet([('1.2.3.6', 26001)])
+        ])
+        master2 = self.make_master([
+            servers_packet([('1.2.3.4', 26000), ('2001:db8::1', 26000)],
+                           header=utils.MASTER_EXT_RESPONSE_HEADER)
+        ])
+        query = MasterQuery([master1.addr, master2.addr], 'Xonotic',
+                            ext=True, timeout=5)
+        with mock.patch('xrcon.master.monotonic_time',
+                        side_effect=utils.monotonic_time) as time_mock:
+            servers = list(query)
+
+        # finished by EOT of both masters
+        self.assertLess(time_mock.call_count, 10)
+        self.assertEqual(len(servers), 4)
+        self.assertEqual(set(servers), set([
+            ('1.2.3.4', 26000), ('1.2.3.5', 26000), ('1.2.3.6', 26001),
+            ('2001:db8::1', 26000)]))
+        self.assertEqual(query.pending, [])
+        self.assertEqual(master1.requests, [six.b(
+            '\xff\xff\xff\xffgetserversExt Xonotic 3 empty full')])
+
+    def test_timeout(self):
+        master1 = self.make_master([
+            servers_packet([('1.2.3.4', 26000)], utils.MASTER_EOF)])
+        master2 = self.make_master([six.b('\xff\xff\xff\xffgarbage'),
+                                    servers_packet([('1.2.3.5', 26000)])])
+        query = MasterQuery([master1.addr, master2.addr], 'Xonotic',
+                            timeout=0.3)
+        self.assertEqual(set(query), set([('1.2.3.4', 26000),
+                                          ('1.2.3.5', 26000)]))
+        self.assertEqual(query.pending, [('127.0.0.1', master1.port)])
+        self.assertIsInstance(query.errors[('127.0.0.1', master2.port)],
+                              ValueError)
+
+    def test_query_masters(self):
+        master = self.make_master([servers_packet([('1.2.3.4', 26000)])])
+        self.assertEqual(query_masters([master.addr], 'Xonotic'),
+                         set([('1.2.3.4', 26000)]))
@@ -0,0 +1,77 @@
+from .base import TestCase, mock
+from xrcon import md4, utils
+import hashlib
+import hmac
+import six
+
+
+b = six.b
+# test suite from RFC 1320
+RFC_VECTORS = [
+    (b(''), '31d6cfe0d16ae931b73c59d7e0c089c0'),
+    (b('a'), 'bde52cb31de33e46245e05fbdbd6fb24'),
+    (b('abc'), 'a448017aaf21d8525fc10ae87aa6729d'),
+    (b('message digest'), 'd9130a8164549fe818874806e1c7014b'),
+    (b('abcdefghijklmnopqrstuvwxyz'), 'd79e1c308aa5bbcdeea8ed63df412da9'),
+    (b('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789'),
+     '043f8582f241db351ce627e153e7f0e4'),
+    (b('1234567890') * 8, 'e33b4ddc9c38f2199c3e7b164fcc0536'),
+]
+
+
+class MD4Test(TestCase):
+
+    def test_rfc_vectors(self):
+        for data, hexdigest in RFC_VECTORS:
+            self.assertEqual(md4.new(data).hexdigest(), hexdigest)
+
+    def test_update(self):
+        for data, hexdigest in RFC_VECTORS:
+            obj = md4.MD4()
+            for i in range(0, len(data), 7):
+                obj.update(data[i:i + 7])
+
+            self.assertEqual(obj.hexdigest(), hexdigest)
+            # digest does not change state
+            self.assertEqual(obj.hexdigest(), hexdigest)
+
+        obj = md4.MD4(b('x') * 200)
+        obj.update(memoryview(b('y') * 100))
+        self.assertEqual(obj.digest(),
+                         md4.new(b('x') * 200 + b('y') * 100).digest())
+
+    def test_copy(self):
+        obj = md4.new(b('message '))
+        other = obj.copy()
+        other.update(b('digest'))
+        self.assertEqual(obj.digest(), md4.new(b('message ')).digest())
+        self.assertEqual(other.hexdigest(), RFC_VECTORS[3][1])
+
+    def test_hmac(self):
+        mac = hmac.new(b('passw'), b('msg'), md4.new)
+        self.assertEqual(mac.digest_size, 16)
+        self.assertEqual(mac.hexdigest(), '43ba098a80ecb8a097a325dc4d408cad')
+        # keys longer than block are hashed
+        mac = hmac.new(b('k') * 100, b('msg'), md4.new)
+        self.assertEqual(mac.digest(), hmac.new(md4.new(b('k') * 100).digest(),
+                                                b('msg'), md4.new).digest())
+
+    def test_fallback(self):
+        with mock.patch('hashlib.new', side_effect=ValueError):
+            self.assertFalse(utils.has_openssl_md4())
+
+        try:
+            hashlib.new('MD4')
+        except ValueError:
+            self.assertIs(utils.md4, md4.new)
+        else:
+            self.assertIs(utils.md4, utils.openssl_md4)
+            for data, hexdigest in RFC_VECTORS:
+                self.assertEqual(utils.md4(data).hexdigest(), hexdigest)
+
+    def test_hmac_many(self):
+        messages = [b(''), b('msg'), b('m') * 150]
+        for key in [b('passw'), b('k') * 100]:
+            self.assertEqual(
+                md4.hmac_many(key, messages),
+                [hmac.new(key, msg, md4.new).digest() for msg in messages])
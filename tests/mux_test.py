@@ -0,0 +1,106 @@
+from .base import TestCase
+from .library_test import STATUS_PACKET, PARSED_SERVER_VARS
+from xrcon import utils
+from xrcon.client import QuakeProtocol
+from xrcon.mux import Multiplexer
+import threading
+import socket
+import six
+
+
+class FakeServer(object):
+
+    def __init__(self, reply=None):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.port = self.sock.getsockname()[1]
+        self.reply = reply
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def serve(self):
+        try:
+            while True:
+                data, addr = self.sock.recvfrom(utils.MAX_PACKET_SIZE)
+                self.sock.sendto(self.reply, addr)
+        except socket.error:
+            pass
+
+    def close(self):
+        self.sock.close()
+
+
+class MultiplexerTest(TestCase):
+
+    def setUp(self):
+        self.mux = Multiplexer()
+        self.addCleanup(self.mux.close)
+
+    def make_server(self, reply=None):
+        server = FakeServer(reply)
+        self.addCleanup(server.close)
+        return server
+
+    def test_dispatch(self):
+        server1, server2 = self.make_server(), self.make_server()
+        qc1 = QuakeProtocol('127.0.0.1', server1.port, timeout=1)
+        qc2 = QuakeProtocol('127.0.0.1', server2.port, timeout=1)
+        qc1.connect(self.mux)
+        qc2.connect(self.mux)
+        self.assertEqual(len(self.mux.sockets[socket.AF_INET]), 1)
+
+        qc1.sock.send(six.b('first'))
+        qc2.sock.send(six.b('second'))
+        data1, addr1 = server1.sock.recvfrom(utils.MAX_PACKET_SIZE)
+        data2, addr2 = server2.sock.recvfrom(utils.MAX_PACKET_SIZE)
+        self.assertEqual((data1, data2), (six.b('first'), six.b('second')))
+        # both sessions use same socket
+        self.assertEqual(addr1, addr2)
+
+        server2.sock.sendto(six.b('reply2'), addr2)
+        server1.sock.sendto(six.b('reply1'), addr1)
+        self.assertEqual(qc1.sock.recv(utils.MAX_PACKET_SIZE),
+                         six.b('reply1'))
+        self.assertEqual(qc2.sock.recv(utils.MAX_PACKET_SIZE),
+                         six.b('reply2'))
+
+        server1.sock.sendto(six.b('reply3'), addr1)
+        buf = bytearray(4)
+        self.assertEqual(qc1.sock.recv_into(buf), 4)
+        self.assertEqual(buf, bytearray(six.b('repl')))
+
+        qc2.close()
+        self.assertEqual(len(self.mux.sessions), 1)
+        server2.sock.sendto(six.b('dropped'), addr2)
+        qc1.sock.settimeout(0.05)
+        with self.assertRaises(socket.timeout):
+            qc1.sock.recv(utils.MAX_PACKET_SIZE)
+
+    def test_getstatus(self):
+        server = self.make_server(STATUS_PACKET)
+        server.start()
+        qc = QuakeProtocol('127.0.0.1', server.port)
+        qc.connect(self.mux)
+        server_vars, players = qc.getstatus()
+        self.assertEqual(server_vars, PARSED_SERVER_VARS)
+        self.assertEqual(len(players), 7)
+
+    def test_register(self):
+        self.mux.register(socket.AF_INET, ('127.0.0.1', 26000))
+        with self.assertRaises(ValueError):
+            self.mux.register(socket.AF_INET, ('127.0.0.1', 26000))
+
+        with self.assertRaises(ValueError):
+            Multiplexer(pool_size=0)
+
+    def test_pool(self):
+        mux = Multiplexer(pool_size=3)
+        self.addCleanup(mux.close)
+        for port in range(26000, 26010):
+            mux.register(socket.AF_INET, ('127.0.0.1', port))
+
+        self.assertEqual(len(mux.sockets[socket.AF_INET]), 3)
+        self.assertEqual(mux.poll(0), 0)
@@ -0,0 +1,169 @@
+from .base import TestCase, mock
+from .library_test import mock_recv
+from xrcon import utils
+from xrcon.client import XRcon
+from xrcon.pipeline import RconPipeline
+import socket
+import six
+
+
+b = six.b
+HEADER = b('\xFF\xFF\xFF\xFFn')
+
+
+class RconPipelineTest(TestCase):
+
+    def setUp(self):
+        socket_patch = mock.patch('socket.socket', spec=socket.socket)
+        self.socket_mock = socket_patch.start()
+        self.addCleanup(socket_patch.stop)
+        self.sock = self.socket_mock.return_value
+
+        sentinel_patch = mock.patch('xrcon.pipeline.make_sentinel')
+        sentinel_mock = sentinel_patch.start()
+        self.addCleanup(sentinel_patch.stop)
+        sentinel_mock.side_effect = [
+            b('begin1'), b('end1'), b('begin2'), b('end2')]
+
+        # every call of clock takes 50 ms, so waits are finite
+        self.now = 100.0
+        time_patch = mock.patch('xrcon.pipeline.monotonic_time',
+                                side_effect=self.tick)
+        time_patch.start()
+        self.addCleanup(time_patch.stop)
+
+        self.rcon = XRcon('127.0.0.1', 26000, 'passw', 0)
+        self.rcon.connect()
+        self.addCleanup(self.rcon.close)
+
+    def tick(self):
+        self.now += 0.05
+        return self.now
+
+    def feed(self, packets):
+        "Received packets, then socket timeouts"
+        mock_recv(self.sock, packets + [socket.timeout] * 100)
+
+    def sent(self):
+        return [call[0][0] for call in self.sock.send.call_args_list]
+
+    def test_pipeline(self):
+        pipeline = RconPipeline(self.rcon)
+        done = []
+        first = pipeline.submit('status', done.append)
+        second = pipeline.submit('echo 2')
+        self.assertEqual(self.sent(), [
+            utils.rcon_nosecure_packet(
+                'passw', 'echo begin1\nstatus\necho end1'),
+            utils.rcon_nosecure_packet(
+                'passw', 'echo begin2\necho 2\necho end2'),
+        ])
+        self.assertEqual(len(pipeline), 2)
+
+        self.feed([
+            HEADER + b('noise\nbegin1\nline1\nli'),
+            HEADER + b('ne2\nend1\nbegin2\n2\n'),
+            HEADER + b('en'),
+            HEADER + b('d2\n'),
+        ])
+        self.assertTrue(pipeline.wait())
+        self.assertEqual(first.output, b('line1\nline2\n'))
+        self.assertEqual(second.result(), b('2\n'))
+        self.assertEqual(done, [first])
+        self.assertEqual(len(pipeline), 0)
+
+        callback = mock.Mock()
+        second.add_done_callback(callback)
+        callback.assert_called_once_with(second)
+
+    def test_max_in_flight(self):
+        pipeline = RconPipeline(self.rcon, max_in_flight=1)
+        first = pipeline.submit('status')
+        second = pipeline.submit('echo 2')
+        self.assertEqual(self.sock.send.call_count, 1)
+
+        self.feed([
+            HEADER + b('begin1\n1\nend1\n')])
+        with self.assertRaises(socket.timeout):
+            second.result(timeout=0.5)
+
+        self.assertEqual(first.output, b('1\n'))
+        self.assertFalse(second.done)
+        self.assertEqual(self.sock.send.call_count, 2)
+        self.assertFalse(pipeline.wait())
+
+    def test_challenge(self):
+        self.rcon.secure_rcon = XRcon.RCON_SECURE_CHALLENGE
+        pipeline = RconPipeline(self.rcon)
+        command = pipeline.submit('status')
+        second = pipeline.submit('echo 2')
+        # darkplaces keeps one challenge per address, so second command
+        # waits until first challenge is used
+        self.assertEqual(self.sent(), [utils.CHALLENGE_PACKET])
+
+        self.feed([
+            b('\xFF\xFF\xFF\xFFchallenge 11111111111\x00'),
+            b('\xFF\xFF\xFF\xFFchallenge 22222222222\x00'),
+            HEADER + b('begin1\nok\nend1\n'),
+            HEADER + b('begin2\n2\nend2\n')
+        ])
+        self.assertTrue(pipeline.wait())
+        self.assertEqual(command.result(), b('ok\n'))
+        self.assertEqual(second.result(), b('2\n'))
+        self.assertEqual(self.sent(), [
+            utils.CHALLENGE_PACKET,
+            utils.rcon_secure_challenge_packet(
+                'passw', b('11111111111'), 'echo begin1\nstatus\necho end1'),
+            utils.CHALLENGE_PACKET,
+            utils.rcon_secure_challenge_packet(
+                'passw', b('22222222222'), 'echo begin2\necho 2\necho end2')
+        ])
+
+    def test_challenge_resend(self):
+        self.rcon.secure_rcon = XRcon.RCON_SECURE_CHALLENGE
+        pipeline = RconPipeline(self.rcon)
+        command = pipeline.submit('status')
+        # response to challenge request is lost
+        self.feed([])
+        self.assertFalse(pipeline.wait(timeout=1.5))
+        self.assertEqual(self.sent(), [utils.CHALLENGE_PACKET] * 2)
+        self.assertEqual(self.rcon.rtt.rto, 2.0)
+
+        self.feed([
+            b('\xFF\xFF\xFF\xFFchallenge 11111111111\x00'),
+            HEADER + b('begin1\nok\nend1\n')
+        ])
+        self.assertTrue(pipeline.wait())
+        self.assertEqual(command.result(), b('ok\n'))
+        self.assertEqual(self.sent()[2], utils.rcon_secure_challenge_packet(
+            'passw', b('11111111111'), 'echo begin1\nstatus\necho end1'))
+
+    def test_lost_end_marker(self):
+        pipeline = RconPipeline(self.rcon)
+        first = pipeline.submit('status')
+        second = pipeline.submit('echo 2')
+        # end marker of first command is lost, end marker of second one is
+        # joined with output without trailing newline
+        self.feed([
+            HEADER + b('begin1\nline1\n'),
+            HEADER + b('begin2\n2end2\n'),
+        ])
+        self.assertTrue(pipeline.wait())
+        with self.assertRaises(socket.error):
+            first.result()
+
+        self.assertEqual(second.result(), b('2'))
+        self.assertIsNone(pipeline.current)
+
+    def test_command_timeout(self):
+        pipeline = RconPipeline(self.rcon, command_timeout=1)
+        done = []
+        command = pipeline.submit('status', done.append)
+        self.feed([HEADER + b('begin1\nline1\n')])
+        self.assertTrue(pipeline.wait(timeout=2))
+        self.assertEqual(done, [command])
+        with self.assertRaises(socket.timeout):
+            command.result()
+
+        self.assertIsNone(pipeline.current)
+        self.assertEqual(len(pipeline), 0)
@@ -0,0 +1,134 @@
+from .base import TestCase, mock
+from xrcon.pool import XRconPool
+import errno
+import socket
+
+
+SOCKET_CLASS = socket.socket
+
+
+class XRconPoolTest(TestCase):
+
+    def setUp(self):
+        socket_patch = mock.patch('socket.socket', spec=socket.socket)
+        self.socket_mock = socket_patch.start()
+        self.addCleanup(socket_patch.stop)
+        self.socket_mock.side_effect = self.make_socket
+
+        getaddrinfo_patch = mock.patch('socket.getaddrinfo',
+                                       wraps=socket.getaddrinfo)
+        self.getaddrinfo_mock = getaddrinfo_patch.start()
+        self.addCleanup(getaddrinfo_patch.stop)
+
+        time_patch = mock.patch('xrcon.pool.monotonic_time')
+        self.time_mock = time_patch.start()
+        self.time_mock.return_value = 100.0
+        self.addCleanup(time_patch.stop)
+
+        self.pool = XRconPool(max_idle=2, idle_timeout=60, check_after=10)
+        self.addCleanup(self.pool.close)
+
+    @staticmethod
+    def make_socket(*args):
+        sock = mock.MagicMock(spec=SOCKET_CLASS)
+        # nothing is received
+        sock.recv.side_effect = socket.error(errno.EAGAIN, 'would block')
+        return sock
+
+    def test_reuse(self):
+        rcon = self.pool.acquire('127.0.0.1', 26000, 'passw', 1)
+        self.assertIsNotNone(rcon.sock)
+        self.pool.release(rcon)
+        self.assertEqual(len(self.pool), 1)
+
+        with self.pool.session('127.0.0.1', 26000, 'passw', 1) as rcon2:
+            self.assertIs(rcon2, rcon)
+            self.assertEqual(len(self.pool), 0)
+
+        self.assertEqual(self.getaddrinfo_mock.call_count, 1)
+        # other key
+        with self.pool.session('127.0.0.1', 26000, 'passw', 2) as rcon3:
+            self.assertIsNot(rcon3, rcon)
+
+        self.assertEqual(len(self.pool), 2)
+
+    def test_max_idle(self):
+        rcons = [self.pool.acquire('127.0.0.1', 26000, 'passw')
+                 for i in range(3)]
+        socks = [rcon.sock for rcon in rcons]
+        for rcon in rcons:
+            self.pool.release(rcon)
+
+        self.assertEqual(len(self.pool), 2)
+        self.assertTrue(socks[0].close.called)
+        self.assertFalse(socks[2].close.called)
+
+    def test_discard(self):
+        with self.assertRaises(socket.timeout):
+            with self.pool.session('127.0.0.1', 26000, 'passw') as rcon:
+                sock = rcon.sock
+                raise socket.timeout
+
+        self.assertTrue(sock.close.called)
+        self.assertEqual(len(self.pool), 0)
+
+        with self.assertRaises(KeyError):
+            with self.pool.session('127.0.0.1', 26000, 'passw'):
+                raise KeyError
+
+        self.assertEqual(len(self.pool), 1)
+
+    def test_pending_response(self):
+        rcon = self.pool.acquire('127.0.0.1', 26000, 'passw')
+        sock = rcon.sock
+        # late response of timed out command
+        sock.recv.side_effect = None
+        sock.recv.return_value = b'\xff'
+        self.pool.release(rcon)
+        self.assertTrue(sock.close.called)
+        self.assertEqual(len(self.pool), 0)
+        sock.settimeout.assert_called_with(0.7)
+
+    def test_health_check(self):
+        rcon = self.pool.acquire('127.0.0.1', 26000, 'passw')
+        rcon.ping2 = mock.Mock(return_value=0.01)
+        self.pool.release(rcon)
+        self.time_mock.return_value = 105.0
+        self.assertIs(self.pool.acquire('127.0.0.1', 26000, 'passw'), rcon)
+        self.assertFalse(rcon.ping2.called)
+
+        self.pool.release(rcon)
+        self.time_mock.return_value = 120.0
+        self.assertIs(self.pool.acquire('127.0.0.1', 26000, 'passw'), rcon)
+        rcon.ping2.assert_called_once_with(0.5)
+
+        self.pool.release(rcon)
+        self.time_mock.return_value = 140.0
+        rcon.ping2.return_value = None
+        sock = rcon.sock
+        new_rcon = self.pool.acquire('127.0.0.1', 26000, 'passw')
+        self.assertIsNot(new_rcon, rcon)
+        self.assertTrue(sock.close.called)
+
+        self.pool.release(new_rcon)
+        new_rcon.ping2 = mock.Mock(side_effect=socket.error)
+        self.time_mock.return_value = 160.0
+        self.assertIsNot(self.pool.acquire('127.0.0.1', 26000, 'passw'),
+                         new_rcon)
+
+    def test_evict_idle(self):
+        rcon1 = self.pool.acquire('127.0.0.1', 26000, 'passw')
+        rcon2 = self.pool.acquire('127.0.0.1', 26001, 'passw')
+        self.pool.release(rcon1)
+        self.time_mock.return_value = 130.0
+        self.pool.release(rcon2)
+        self.time_mock.return_value = 170.0
+        self.assertEqual(self.pool.evict_idle(), 1)
+        self.assertIsNone(rcon1.sock)
+        self.assertEqual(len(self.pool), 1)
+
+        # expired session is not returned
+        self.time_mock.return_value = 200.0
+        self.assertIsNot(self.pool.acquire('127.0.0.1', 26001, 'passw'),
+                         rcon2)
+        self.assertIsNone(rcon2.sock)
@@ -0,0 +1,77 @@
+from .base import TestCase, mock
+from .library_test import STATUS_PACKET, PARSED_SERVER_VARS
+from .mux_test import FakeServer
+from xrcon import utils
+from xrcon.client import QuakeProtocol
+from xrcon.query import query_many
+import socket
+import six
+
+
+class QueryManyTest(TestCase):
+
+    def make_server(self, reply=None, start=True):
+        server = FakeServer(reply)
+        self.addCleanup(server.close)
+        if start:
+            server.start()
+        return server
+
+    def test_getstatus(self):
+        servers = [self.make_server(STATUS_PACKET) for i in range(3)]
+        addrs = ['127.0.0.1:{0}'.format(server.port) for server in servers]
+        results = list(query_many(addrs + ['bad:addr'], workers=2))
+        self.assertEqual(len(results), 4)
+        self.assertEqual(set(res.server for res in results),
+                         set(addrs + ['bad:addr']))
+
+        results = dict((res.server, res) for res in results)
+        self.assertIsInstance(results['bad:addr'].error, ValueError)
+        for addr in addrs:
+            res = results[addr]
+            self.assertIsNone(res.error)
+            self.assertEqual(res.op, 'getstatus')
+            self.assertEqual(res.result[0], PARSED_SERVER_VARS)
+            self.assertGreaterEqual(res.latency, 0)
+
+    def test_op_timeout_ignored(self):
+        server = self.make_server(STATUS_PACKET)
+        addr = '127.0.0.1:{0}'.format(server.port)
+        res = list(query_many([addr], 'getstatus', op_timeout=0.5))[0]
+        self.assertIsNone(res.error)
+        self.assertEqual(res.result[0], PARSED_SERVER_VARS)
+        self.assertIsNotNone(res.result[1])
+
+        with mock.patch.object(QuakeProtocol, 'getinfo',
+                               return_value={}) as getinfo_mock:
+            res = list(query_many([addr], 'getinfo', op_timeout=0.5))[0]
+
+        self.assertIsNone(res.error)
+        getinfo_mock.assert_called_once_with()
+
+    def test_ping_deadline(self):
+        good = self.make_server(utils.PONG_Q2_PACKET)
+        silent = self.make_server(start=False)
+        results = list(query_many(
+            ['127.0.0.1:{0}'.format(good.port),
+             '127.0.0.1:{0}'.format(silent.port)],
+            'ping2', deadline=0.3, op_timeout=0.5))
+        self.assertIsNone(results[0].error)
+        self.assertGreaterEqual(results[0].result, 0)
+        self.assertIsInstance(results[1].error, socket.timeout)
+        self.assertIsNone(results[1].latency)
+
+    def test_execute(self):
+        server = self.make_server(utils.RCON_RESPONSE_HEADER + six.b('ok'))
+        results = list(query_many(
+            ['127.0.0.1:{0}'.format(server.port)], 'execute',
+            password='passw', command='status', op_timeout=0.1))
+        self.assertEqual(results[0].result, six.b('ok'))
+
+        with self.assertRaises(ValueError):
+            list(query_many(['127.0.0.1'], 'execute'))
+
+        with self.assertRaises(ValueError):
+            list(query_many(['127.0.0.1'], 'unknown'))
+
+        self.assertEqual(list(query_many([])), [])
@@ -0,0 +1,84 @@
+from .base import TestCase, mock
+from xrcon.client import XRcon
+from xrcon.ratelimit import TokenBucket, RateLimiter
+import socket
+
+
+class TokenBucketTest(TestCase):
+
+    def test_burst(self):
+        bucket = TokenBucket(rate=10, burst=3)
+        delays = [bucket.reserve(100.0) for i in range(5)]
+        self.assertEqual(delays[:3], [0, 0, 0])
+        self.assertAlmostEqual(delays[3], 0.1)
+        self.assertAlmostEqual(delays[4], 0.2)
+        self.assertFalse(bucket.is_full(100.2))
+        self.assertTrue(bucket.is_full(100.5))
+        # bucket is refilled
+        self.assertEqual(bucket.reserve(101.0), 0)
+
+    def test_validate(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(0)
+
+        with self.assertRaises(ValueError):
+            TokenBucket(1, 0)
+
+
+class RateLimiterTest(TestCase):
+
+    def setUp(self):
+        time_patch = mock.patch('xrcon.ratelimit.monotonic_time')
+        self.time_mock = time_patch.start()
+        self.time_mock.return_value = 100.0
+        self.addCleanup(time_patch.stop)
+
+        sleep_patch = mock.patch('time.sleep')
+        self.sleep_mock = sleep_patch.start()
+        self.addCleanup(sleep_patch.stop)
+
+    def test_per_server(self):
+        limiter = RateLimiter(rate=2, burst=2)
+        server1, server2 = ('server1', 26000), ('server2', 26000)
+        self.assertEqual(limiter.acquire(server1), 0)
+        self.assertEqual(limiter.acquire(server1), 0)
+        self.assertFalse(self.sleep_mock.called)
+        self.assertAlmostEqual(limiter.acquire(server1), 0.5)
+        self.sleep_mock.assert_called_once_with(0.5)
+        self.assertEqual(limiter.reserve(server2), 0)
+
+        limiter.set_limit(server2, 1)
+        self.assertEqual(limiter.reserve(server2), 0)
+        self.assertAlmostEqual(limiter.reserve(server2), 1)
+        self.assertEqual(len(limiter), 2)
+
+        self.time_mock.return_value = 110.0
+        self.assertEqual(limiter.evict_idle(), 1)
+        self.assertEqual(list(limiter.buckets.keys()), [server2])
+
+    def test_global(self):
+        limiter = RateLimiter(rate=1, burst=1, global_rate=10, global_burst=2)
+        delays = [limiter.acquire(('server', i)) for i in range(4)]
+        self.assertEqual(delays[:2], [0, 0])
+        self.assertAlmostEqual(delays[2], 0.1)
+        self.assertAlmostEqual(delays[3], 0.2)
+        # server schedule is moved by global delay
+        self.assertAlmostEqual(limiter.reserve(('server', 3)), 1.2)
+
+        # command waiting for server does not delay other servers
+        limiter = RateLimiter(rate=1, burst=1, global_rate=10, global_burst=1)
+        self.assertEqual(limiter.acquire(('server', 1)), 0)
+        self.assertAlmostEqual(limiter.reserve(('server', 1)), 1)
+        self.assertAlmostEqual(limiter.acquire(('server', 2)), 0.1)
+        self.assertEqual(RateLimiter().reserve_global(('server', 1)), 0)
+
+    @mock.patch('socket.socket', spec=socket.socket)
+    def test_xrcon_send(self, socket_mock):
+        rcon = XRcon('127.0.0.1', 26000, 'passw', 0)
+        rcon.rate_limiter = RateLimiter(rate=1, burst=1)
+        rcon.connect()
+        rcon.send('echo 1')
+        rcon.send('echo 2')
+        self.sleep_mock.assert_called_once_with(1.0)
+        self.assertEqual(socket_mock.return_value.send.call_count, 2)
+        rcon.close()
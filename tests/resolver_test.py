@@ -0,0 +1,100 @@
+from .base import TestCase, mock
+from xrcon.resolver import Resolver
+from xrcon.client import QuakeProtocol
+import socket
+
+
+ADDR_INFO = [
+    (socket.AF_INET6, socket.SOCK_DGRAM, 17, '', ('::1', 26000, 0, 0)),
+    (socket.AF_INET, socket.SOCK_DGRAM, 17, '', ('127.0.0.1', 26000))
+]
+
+
+class ResolverTest(TestCase):
+
+    def setUp(self):
+        getaddrinfo_patch = mock.patch('socket.getaddrinfo')
+        self.getaddrinfo_mock = getaddrinfo_patch.start()
+        self.getaddrinfo_mock.return_value = ADDR_INFO
+        self.addCleanup(getaddrinfo_patch.stop)
+
+        time_patch = mock.patch('xrcon.resolver.monotonic_time')
+        self.time_mock = time_patch.start()
+        self.time_mock.return_value = 100.0
+        self.addCleanup(time_patch.stop)
+
+        self.resolver = Resolver(ttl=60, negative_ttl=10)
+
+    def test_cache(self):
+        resolver = self.resolver
+        self.assertIsNone(resolver.get_cached('server', 26000))
+        self.assertEqual(resolver.getaddrinfo('server', 26000), ADDR_INFO)
+        self.assertEqual(resolver.getaddrinfo('server', 26000), ADDR_INFO)
+        self.assertEqual(self.getaddrinfo_mock.call_count, 1)
+        self.assertEqual(resolver.get_cached('server', 26000), ADDR_INFO)
+
+        # other arguments are other key
+        resolver.getaddrinfo('server', 26000, socket.AF_INET)
+        self.assertEqual(self.getaddrinfo_mock.call_count, 2)
+        self.assertEqual(len(resolver), 2)
+
+        # protocol is implied by socket type
+        resolver.resolve_many([('server', 26000)])
+        resolver.getaddrinfo('server', 26000, 0, socket.SOCK_DGRAM,
+                             socket.IPPROTO_UDP)
+        self.assertEqual(self.getaddrinfo_mock.call_count, 3)
+        self.assertEqual(len(resolver), 3)
+
+        self.time_mock.return_value = 161.0
+        self.assertIsNone(resolver.get_cached('server', 26000))
+        self.assertEqual(resolver.evict_expired(), 2)
+        self.assertEqual(len(resolver), 0)
+        resolver.getaddrinfo('server', 26000)
+        self.assertEqual(self.getaddrinfo_mock.call_count, 4)
+
+        resolver.clear()
+        self.assertEqual(len(resolver), 0)
+
+    def test_negative_cache(self):
+        self.getaddrinfo_mock.side_effect = socket.gaierror("Not found")
+        with self.assertRaises(socket.gaierror):
+            self.resolver.getaddrinfo('bad.server', 26000)
+
+        with self.assertRaises(socket.gaierror):
+            self.resolver.getaddrinfo('bad.server', 26000)
+
+        self.assertEqual(self.getaddrinfo_mock.call_count, 1)
+        self.time_mock.return_value = 111.0
+        self.getaddrinfo_mock.side_effect = None
+        self.assertEqual(self.resolver.getaddrinfo('bad.server', 26000),
+                         ADDR_INFO)
+
+    def test_resolve_many(self):
+        def getaddrinfo(host, *args):
+            if host == 'bad':
+                raise socket.gaierror("Not found")
+            return ADDR_INFO
+
+        self.getaddrinfo_mock.side_effect = getaddrinfo
+        addrs = [('server{0}'.format(i), 26000) for i in range(20)]
+        addrs.append(('bad', 26000))
+        results = self.resolver.resolve_many(addrs, workers=4)
+        self.assertEqual(len(results), 21)
+        self.assertIsInstance(results[('bad', 26000)], socket.gaierror)
+        self.assertEqual(results[('server3', 26000)], ADDR_INFO)
+        self.assertEqual(
+            self.resolver.get_cached('server3', 26000, 0, socket.SOCK_DGRAM),
+            ADDR_INFO)
+        self.assertEqual(self.resolver.resolve_many([]), {})
+
+    @mock.patch('socket.socket', spec=socket.socket)
+    def test_client_resolver(self, socket_mock):
+        qc = QuakeProtocol('server', 26000)
+        qc.resolver = self.resolver
+        qc.connect()
+        qc.close()
+        qc.connect()
+        socket_mock.return_value.connect.assert_called_with(
+            ('127.0.0.1', 26000))
+        self.getaddrinfo_mock.assert_called_once_with(
+            'server', 26000, 0, socket.SOCK_DGRAM, 0, 0)
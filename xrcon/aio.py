@@ -0,0 +1,435 @@
+"""asyncio based clients, requires python 3.6+
+
+Example:
+
+    rcon = AsyncXRcon('server', 26000, 'password')
+    await rcon.connect()
+    try:
+        data = await rcon.execute('status')
+    finally:
+        rcon.close()
+"""
+import asyncio
+import socket
+from collections import namedtuple
+from functools import wraps
+from .client import QuakeProtocol, XRcon, NotConnected, RttEstimator
+from .utils import (
+    rcon_nosecure_packet,
+    parse_challenge_response,
+    parse_rcon_response,
+    parse_server_addr,
+    parse_status_packet,
+    parse_info_packet,
+    is_info_response,
+    info_packet,
+    make_query_challenge,
+    StatusResponse,
+    make_sentinel,
+    append_sentinel,
+    strip_sentinel,
+    LineDecoder,
+    CHALLENGE_PACKET,
+    CHALLENGE_RESPONSE_HEADER,
+    RCON_RESPONSE_HEADER,
+    PING_Q2_PACKET,
+    PONG_Q2_PACKET,
+    PING_Q3_PACKET,
+    PONG_Q3_PACKET,
+    QUAKE_STATUS_PACKET,
+    STATUS_RESPONSE_HEADER
+)
+
+
+def transport_required(fun):
+    @wraps(fun)
+    def wrapper(self, *args, **kwargs):
+        if self.transport is None:
+            raise NotConnected("You should call connect first")
+
+        return fun(self, *args, **kwargs)
+
+    return wrapper
+
+
+class QuakeDatagramProtocol(asyncio.DatagramProtocol):
+    "Collects received datagrams into queue"
+
+    def __init__(self):
+        self.packets = asyncio.Queue()
+
+    def datagram_received(self, data, addr):
+        self.packets.put_nowait(data)
+
+    def error_received(self, exc):
+        # same errors would be raised by socket.recv in blocking client
+        self.packets.put_nowait(exc)
+
+    async def recv(self):
+        packet = await self.packets.get()
+        if isinstance(packet, Exception):
+            raise packet
+
+        return packet
+
+
+class AsyncQuakeProtocol(object):
+
+    CHALLENGE_TIMEOUT = QuakeProtocol.CHALLENGE_TIMEOUT
+    player_factory = QuakeProtocol.player_factory
+    resolver = None
+
+    def __init__(self, host, port, timeout=0.7):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.transport = None
+        self.protocol = None
+        self.rtt = RttEstimator()
+
+    async def connect(self):
+        "Create datagram endpoint connected to server"
+        loop = asyncio.get_event_loop()
+        if self.resolver is None:
+            params = await loop.getaddrinfo(self.host, self.port,
+                                            type=socket.SOCK_DGRAM)
+        else:
+            params = self.resolver.get_cached(self.host, self.port, 0,
+                                              socket.SOCK_DGRAM)
+            if params is None:
+                params = await loop.run_in_executor(
+                    None, self.resolver.getaddrinfo, self.host, self.port, 0,
+                    socket.SOCK_DGRAM)
+
+        family, stype, proto, cname, sockaddr = \
+            QuakeProtocol.pick_connection_params(params)
+        self.transport, self.protocol = await loop.create_datagram_endpoint(
+            QuakeDatagramProtocol, remote_addr=sockaddr, family=family)
+
+    @transport_required
+    def close(self):
+        "Close connection"
+        self.transport.close()
+        self.transport = None
+        self.protocol = None
+
+    @transport_required
+    async def read_iterator(self, timeout=3):
+        loop = asyncio.get_event_loop()
+        timeout_time = loop.time() + timeout
+        while loop.time() < timeout_time:
+            wait_time = timeout_time - loop.time()
+            if self.timeout is not None:
+                # behave like socket timeout in blocking client
+                wait_time = min(wait_time, self.timeout)
+
+            try:
+                packet = await asyncio.wait_for(self.protocol.recv(),
+                                                wait_time)
+            except asyncio.TimeoutError:
+                raise socket.timeout("timed out")
+
+            yield packet
+
+        raise socket.timeout("Read timeout")
+
+    @transport_required
+    async def request(self, packet, is_response, timeout):
+        "Same as QuakeProtocol.request"
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        rto = self.rtt.rto
+        retransmitted = False
+        while True:
+            sent_time = loop.time()
+            self.transport.sendto(packet)
+            window_end = min(sent_time + rto, deadline)
+            while True:
+                try:
+                    async for response in self.read_iterator(
+                            window_end - loop.time()):
+                        if is_response(response):
+                            rtt = loop.time() - sent_time
+                            if not retransmitted:
+                                self.rtt.update(rtt)
+                            return response, rtt
+                except socket.timeout:
+                    if loop.time() >= window_end:
+                        break
+
+            if window_end >= deadline:
+                raise socket.timeout("Read timeout")
+
+            rto = self.rtt.backoff()
+            retransmitted = True
+
+    @transport_required
+    async def getchallenge(self):
+        "Return server challenge"
+        packet, _ = await self.request(
+            CHALLENGE_PACKET,
+            lambda p: p.startswith(CHALLENGE_RESPONSE_HEADER),
+            self.CHALLENGE_TIMEOUT)
+        return parse_challenge_response(packet)
+
+    @transport_required
+    async def getstatus_packet(self):
+        packet, _ = await self.request(
+            QUAKE_STATUS_PACKET,
+            lambda p: p.startswith(STATUS_RESPONSE_HEADER),
+            self.CHALLENGE_TIMEOUT)
+        return packet
+
+    async def getstatus(self, players=True, lazy=False):
+        """Returns tuple (server vars, players), players are not parsed and
+        None is returned instead of them if players is False. If lazy is
+        True then StatusResponse is returned instead of tuple"""
+        packet = await self.getstatus_packet()
+        if packet is None:
+            return None
+        if lazy:
+            return StatusResponse(packet, self.player_factory)
+        return parse_status_packet(packet, self.player_factory, players)
+
+    @transport_required
+    async def getinfo(self):
+        """Returns dict of server vars from infoResponse, it is much smaller
+        than status response and does not contain players
+
+        Response with other challenge (for example reply to previous
+        request) is ignored.
+        """
+        challenge = make_query_challenge()
+        packet, _ = await self.request(
+            info_packet(challenge),
+            lambda p: is_info_response(p, challenge),
+            self.CHALLENGE_TIMEOUT)
+        return parse_info_packet(packet)
+
+    async def _ping(self, ping_packet, pong_packet, timeout=1):
+        try:
+            _, rtt = await self.request(ping_packet,
+                                        lambda p: p == pong_packet, timeout)
+        except socket.timeout:
+            return None
+
+        return rtt
+
+    @transport_required
+    async def ping2(self, timeout=1):
+        return await self._ping(PING_Q2_PACKET, PONG_Q2_PACKET, timeout)
+
+    @transport_required
+    async def ping3(self, timeout=1):
+        return await self._ping(PING_Q3_PACKET, PONG_Q3_PACKET, timeout)
+
+    @classmethod
+    def create_by_server_str(cls, server_str, *args, **kwargs):
+        host, port = parse_server_addr(server_str)
+        return cls(host, port, *args, **kwargs)
+
+
+class AsyncXRcon(AsyncQuakeProtocol):
+
+    RCON_NOSECURE = XRcon.RCON_NOSECURE
+    RCON_SECURE_TIME = XRcon.RCON_SECURE_TIME
+    RCON_SECURE_CHALLENGE = XRcon.RCON_SECURE_CHALLENGE
+    RCON_TYPES = XRcon.RCON_TYPES
+
+    _secure_rcon = RCON_SECURE_TIME
+    rate_limiter = None
+    secure_rcon = XRcon.secure_rcon
+    password = XRcon.password
+    signer = XRcon.signer
+
+    def __init__(self, host, port, password, secure_rcon=RCON_SECURE_TIME,
+                 timeout=0.7):
+        """ Same arguments as XRcon accepts """
+        super(AsyncXRcon, self).__init__(host, port, timeout)
+        self.password = password
+        self.secure_rcon = secure_rcon
+
+    @transport_required
+    async def throttle(self):
+        "Same as XRcon.throttle but does not block event loop"
+        if self.rate_limiter is None:
+            return
+
+        key = (self.host, self.port)
+        for reserve in (self.rate_limiter.reserve,
+                        self.rate_limiter.reserve_global):
+            delay = reserve(key)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    @transport_required
+    async def send(self, command):
+        "Send rcon command to server"
+        await self.throttle()
+        if self.secure_rcon == self.RCON_NOSECURE:
+            packet = rcon_nosecure_packet(self.password, command)
+        elif self.secure_rcon == self.RCON_SECURE_TIME:
+            packet = self.signer.time_packet(command)
+        elif self.secure_rcon == self.RCON_SECURE_CHALLENGE:
+            challenge = await self.getchallenge()
+            packet = self.signer.challenge_packet(challenge, command)
+        else:
+            raise ValueError("Bad value of secure_rcon")
+
+        self.transport.sendto(packet)
+
+    @transport_required
+    async def read_once(self, timeout=2):
+        async for packet in self.read_iterator(timeout):
+            if packet.startswith(RCON_RESPONSE_HEADER):
+                return parse_rcon_response(packet)
+
+    @transport_required
+    async def read_untill(self, timeout=1):
+        data = []
+        try:
+            async for packet in self.read_iterator(timeout):
+                if packet.startswith(RCON_RESPONSE_HEADER):
+                    data.append(parse_rcon_response(packet))
+        except socket.timeout:
+            pass
+
+        if data:
+            return b''.join(data)
+
+    @transport_required
+    async def read_until_sentinel(self, sentinel, timeout=1):
+        "Same as XRcon.read_until_sentinel"
+        data = []
+        tail = b''
+        tail_size = len(sentinel) + 1
+        try:
+            async for packet in self.read_iterator(timeout):
+                if packet.startswith(RCON_RESPONSE_HEADER):
+                    chunk = parse_rcon_response(packet)
+                    data.append(chunk)
+                    tail = (tail + chunk)[-tail_size:]
+                    if strip_sentinel(tail, sentinel)[1]:
+                        break
+        except socket.timeout:
+            pass
+
+        output, _ = strip_sentinel(b''.join(data), sentinel)
+        if output:
+            return output
+
+    @transport_required
+    async def stream(self, command, timeout=1, sentinel=False,
+                     encoding='utf8'):
+        "Async iterator version of XRcon.stream"
+        token_line = None
+        if sentinel:
+            token = make_sentinel()
+            token_line = token.decode('ascii') + '\n'
+            command = append_sentinel(command, token)
+
+        await self.send(command)
+        decoder = LineDecoder(encoding)
+        try:
+            async for packet in self.read_iterator(timeout):
+                if packet.startswith(RCON_RESPONSE_HEADER):
+                    for line in decoder.feed(parse_rcon_response(packet)):
+                        if token_line and line.endswith(token_line):
+                            line = line[:-len(token_line)]
+                            if line:
+                                yield line
+                            return
+
+                        yield line
+        except socket.timeout:
+            pass
+
+        tail = decoder.flush()
+        if tail:
+            yield tail
+
+    @transport_required
+    async def execute(self, command, timeout=1, sentinel=False):
+        """Execute rcon command on server and fetch result
+        Args:
+            command --- executed command
+            timeout --- read timeout
+            sentinel --- stop reading when output of appended unique echo
+            command is received
+
+        Returns: bytes response
+        """
+        if sentinel:
+            token = make_sentinel()
+            await self.send(append_sentinel(command, token))
+            return await self.read_until_sentinel(token, timeout)
+
+        await self.send(command)
+        return await self.read_untill(timeout)
+
+
+ExecuteResult = namedtuple('ExecuteResult',
+                           ['rcon', 'output', 'latency', 'error'])
+
+
+async def execute_many(rcons, command, timeout=None, concurrency=64):
+    """Execute same command on many servers at once
+
+    Args:
+        rcons --- iterable of AsyncXRcon objects, not connected objects would
+        be connected before and closed after command execution
+        command --- executed command
+        timeout --- read timeout, by default timeout of each rcon object
+        concurrency --- maximum number of servers queried simultaneously
+
+    Yields: ExecuteResult for each server in order of completion, latency
+    is time spent for command execution in seconds, error is exception
+    if command failed
+    """
+    loop = asyncio.get_event_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def execute_one(rcon):
+        async with semaphore:
+            start = loop.time()
+            need_connect = rcon.transport is None
+            try:
+                if need_connect:
+                    await rcon.connect()
+                try:
+                    read_timeout = rcon.timeout if timeout is None \
+                        else timeout
+                    output = await rcon.execute(command, read_timeout)
+                finally:
+                    if need_connect:
+                        rcon.close()
+            except socket.error as e:
+                return ExecuteResult(rcon, None, loop.time() - start, e)
+
+            return ExecuteResult(rcon, output, loop.time() - start, None)
+
+    tasks = [asyncio.ensure_future(execute_one(rcon)) for rcon in rcons]
+    try:
+        for future in asyncio.as_completed(tasks):
+            yield await future
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def iter_execute_many(rcons, command, timeout=None, concurrency=64):
+    """Blocking version of execute_many, runs own event loop
+
+    Yields: ExecuteResult in order of completion
+    """
+    loop = asyncio.new_event_loop()
+    results = execute_many(rcons, command, timeout, concurrency)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(results.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(results.aclose())
+        loop.close()
@@ -0,0 +1,146 @@
+"""Shared cache of server statuses
+
+Example:
+
+    cache = StatusCache(ttl=5, stale_ttl=30)
+    server_vars, players = cache.getstatus('server', 26000)
+
+Many threads could use one cache, server gets at most one status request
+per ttl however many callers there are.
+"""
+import threading
+from .client import QuakeProtocol
+from .utils import monotonic_time, parse_status_packet, StatusResponse
+
+
+class Flight(object):
+    "Status request in progress, other callers wait for its result"
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.packet = None
+        self.error = None
+
+    def wait(self):
+        self.event.wait()
+        if self.error is not None:
+            raise self.error
+
+        return self.packet
+
+
+class StatusCache(object):
+    """Thread-safe cache of status response packets with TTL
+
+    Concurrent requests of same server share one network request
+    (single-flight). Status older than ttl but younger than stale_ttl is
+    returned immediately and refreshed in background thread
+    (stale-while-revalidate).
+
+    Raw packets are cached and parsed for every caller, so callers do not
+    share mutable results.
+    """
+
+    protocol_class = QuakeProtocol
+
+    def __init__(self, ttl=5, stale_ttl=None, timeout=0.7):
+        """ ttl --- seconds while status is fresh
+        stale_ttl --- seconds while stale status could be returned during
+        refresh, None disables stale-while-revalidate
+        timeout --- socket timeout of requests
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.timeout = timeout
+        self.packets = {}  # (host, port) -> (fetch time, packet)
+        self.flights = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.packets)
+
+    def fetch(self, host, port):
+        "Request status packet from server"
+        qp = self.protocol_class(host, port, self.timeout)
+        qp.connect()
+        try:
+            return qp.getstatus_packet()
+        finally:
+            qp.close()
+
+    def run_flight(self, key, flight):
+        try:
+            flight.packet = self.fetch(*key)
+        except Exception as e:
+            flight.error = e
+        else:
+            with self.lock:
+                self.packets[key] = (monotonic_time(), flight.packet)
+        finally:
+            with self.lock:
+                del self.flights[key]
+
+            flight.event.set()
+
+    def getstatus_packet(self, host, port):
+        """Returns cached or fresh status packet
+
+        Raises: same errors as QuakeProtocol.getstatus_packet, errors are
+        not cached
+        """
+        key = (host, port)
+        with self.lock:
+            record = self.packets.get(key)
+            if record is not None:
+                age = monotonic_time() - record[0]
+                if age < self.ttl:
+                    return record[1]
+
+                stale = self.stale_ttl is not None and age < self.stale_ttl
+            else:
+                stale = False
+
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+
+        if stale:
+            if leader:
+                thread = threading.Thread(target=self.run_flight,
+                                          args=(key, flight))
+                thread.daemon = True
+                thread.start()
+
+            return record[1]
+
+        if leader:
+            self.run_flight(key, flight)
+
+        return flight.wait()
+
+    def getstatus(self, host, port, players=True, lazy=False):
+        "Same as QuakeProtocol.getstatus but cached"
+        packet = self.getstatus_packet(host, port)
+        player_factory = self.protocol_class.player_factory
+        if lazy:
+            return StatusResponse(packet, player_factory)
+
+        return parse_status_packet(packet, player_factory, players)
+
+    def evict_expired(self):
+        "Remove records which could not be returned, returns their number"
+        max_age = self.ttl if self.stale_ttl is None else \
+            max(self.ttl, self.stale_ttl)
+        now = monotonic_time()
+        with self.lock:
+            expired = [key for key, record in self.packets.items()
+                       if now - record[0] >= max_age]
+            for key in expired:
+                del self.packets[key]
+
+        return len(expired)
+
+    def clear(self):
+        with self.lock:
+            self.packets.clear()
@@ -1,16 +1,26 @@
+import collections
 import socket
-import time
 from functools import wraps
 import six
 from .utils import (
     rcon_nosecure_packet,
-    rcon_secure_time_packet,
-    rcon_secure_challenge_packet,
+    RconSigner,
     parse_challenge_response,
     parse_rcon_response,
     parse_server_addr,
     parse_status_packet,
+    parse_info_packet,
+    is_info_response,
+    info_packet,
+    make_query_challenge,
+    StatusResponse,
+    make_sentinel,
+    append_sentinel,
+    pack_commands,
+    packet_startswith,
+    LineDecoder,
     Player,
+    monotonic_time,
     CHALLENGE_PACKET,
     CHALLENGE_RESPONSE_HEADER,
     RCON_RESPONSE_HEADER,
@@ -39,24 +49,78 @@ def connection_required(fun):
     return wrapper
 
 
+class RttEstimator(object):
+    """Round trip time estimator and retransmission timeout calculator
+    from RFC 6298 (same as TCP uses)"""
+
+    ALPHA = 1 / 8.0
+    BETA = 1 / 4.0
+    K = 4
+    GRANULARITY = 0.001
+
+    def __init__(self, initial_rto=1.0, min_rto=0.1, max_rto=3.0):
+        """ initial_rto --- retransmission timeout until first sample
+        min_rto, max_rto --- bounds of retransmission timeout
+        """
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.srtt = None
+        self.rttvar = None
+        self.rto = initial_rto
+
+    def update(self, rtt):
+        "Add round trip time sample, returns new retransmission timeout"
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2.0
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + \
+                self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+
+        rto = self.srtt + max(self.GRANULARITY, self.K * self.rttvar)
+        self.rto = min(max(rto, self.min_rto), self.max_rto)
+        return self.rto
+
+    def backoff(self):
+        "Double retransmission timeout after loss, returns new value"
+        self.rto = min(self.rto * 2, self.max_rto)
+        return self.rto
+
+
 class QuakeProtocol(object):
 
     CHALLENGE_TIMEOUT = 3
     player_factory = Player.parse_player
+    resolver = None
+    "optional xrcon.resolver.Resolver, it caches address lookups"
 
     def __init__(self, host, port, timeout=0.7):
         self.host = host
         self.port = port
         self.timeout = timeout
         self.sock = None
+        # reusable buffer for read_view_iterator
+        self.recv_buffer = memoryview(bytearray(MAX_PACKET_SIZE))
+        # could be replaced by estimator shared with other sessions
+        self.rtt = RttEstimator()
 
-    def connect(self):
-        "Create connection to server"
+    def connect(self, multiplexer=None):
+        """Create connection to server
+
+        Args:
+            multiplexer --- optional xrcon.mux.Multiplexer, if passed then
+            session would use its shared socket instead of own one
+        """
         family, stype, proto, cname, sockaddr = self.best_connection_params(
-            self.host, self.port)
-        self.sock = socket.socket(family, stype)
+            self.host, self.port, self.resolver)
+        if multiplexer is not None:
+            self.sock = multiplexer.register(family, sockaddr)
+        else:
+            self.sock = socket.socket(family, stype)
+            self.sock.connect(sockaddr)
+
         self.sock.settimeout(self.timeout)
-        self.sock.connect(sockaddr)
 
     @connection_required
     def close(self):
@@ -64,17 +128,51 @@ class QuakeProtocol(object):
         self.sock.close()
         self.sock = None
 
+    def iter_timeouts(self, timeout):
+        """Yields socket timeouts for reads until deadline
+
+        Each timeout is exact remaining time (but not more than
+        self.timeout), so deadline is never overshot.
+        """
+        timeout_time = monotonic_time() + timeout
+        while True:
+            time_left = timeout_time - monotonic_time()
+            if time_left <= 0:
+                break
+
+            if self.timeout is not None:
+                time_left = min(time_left, self.timeout)
+
+            yield time_left
+
+        raise socket.timeout("Read timeout")
+
     @connection_required
     def read_iterator(self, timeout=3):
-        timeout_time = time.time() + timeout
-        while time.time() < timeout_time:
+        "Yields received packets until deadline"
+        for time_left in self.iter_timeouts(timeout):
+            self.sock.settimeout(time_left)
             yield self.sock.recv(MAX_PACKET_SIZE)
 
-        raise socket.timeout("Read timeout")
+    @connection_required
+    def read_view_iterator(self, timeout=3):
+        """Same as read_iterator but packets are received into reusable
+        buffer, yielded memoryview is valid only until next iteration"""
+        for time_left in self.iter_timeouts(timeout):
+            self.sock.settimeout(time_left)
+            size = self.sock.recv_into(self.recv_buffer)
+            yield self.recv_buffer[:size]
+
+    @classmethod
+    def best_connection_params(cls, host, port, resolver=None):
+        getaddrinfo = socket.getaddrinfo if resolver is None \
+            else resolver.getaddrinfo
+        params = getaddrinfo(host, port, 0, socket.SOCK_DGRAM)
+        return cls.pick_connection_params(params)
 
     @staticmethod
-    def best_connection_params(host, port):
-        params = socket.getaddrinfo(host, port, 0, socket.SOCK_DGRAM)
+    def pick_connection_params(params):
+        "Pick best address from getaddrinfo result, IPv4 is preferred"
         for data in params:
             if data[0] == socket.AF_INET:
                 return data
@@ -82,40 +180,106 @@ class QuakeProtocol(object):
         if len(params) > 0:
             return params[0]
 
+    @connection_required
+    def request(self, packet, is_response, timeout):
+        """Send idempotent request and wait for response
+
+        Request is retransmitted if there is no response during
+        retransmission timeout, which is computed from round trip times
+        and doubled after every loss.
+
+        Args:
+            packet --- request packet
+            is_response --- function which returns True for response packet
+            timeout --- total time of waiting
+
+        Returns: tuple (response, rtt), where rtt is time since last
+        transmission
+
+        Raises: socket.timeout if there is no response until deadline
+        """
+        deadline = monotonic_time() + timeout
+        rto = self.rtt.rto
+        retransmitted = False
+        while True:
+            sent_time = monotonic_time()
+            self.sock.send(packet)
+            window_end = min(sent_time + rto, deadline)
+            # socket timeout could be shorter than window, so read again
+            # until window ends
+            while True:
+                try:
+                    for response in self.read_view_iterator(
+                            window_end - monotonic_time()):
+                        if is_response(response):
+                            rtt = monotonic_time() - sent_time
+                            # Karn's algorithm, response to retransmitted
+                            # request could be response to any transmission
+                            if not retransmitted:
+                                self.rtt.update(rtt)
+                            return response.tobytes(), rtt
+                except socket.timeout:
+                    if monotonic_time() >= window_end:
+                        break
+
+            if window_end >= deadline:
+                raise socket.timeout("Read timeout")
+
+            rto = self.rtt.backoff()
+            retransmitted = True
+
     @connection_required
     def getchallenge(self):
         "Return server challenge"
-        self.sock.send(CHALLENGE_PACKET)
-        # wait challenge response
-        for packet in self.read_iterator(self.CHALLENGE_TIMEOUT):
-            if packet.startswith(CHALLENGE_RESPONSE_HEADER):
-                return parse_challenge_response(packet)
+        packet, _ = self.request(
+            CHALLENGE_PACKET,
+            lambda p: packet_startswith(p, CHALLENGE_RESPONSE_HEADER),
+            self.CHALLENGE_TIMEOUT)
+        return parse_challenge_response(packet)
 
     @connection_required
     def getstatus_packet(self):
-        self.sock.send(QUAKE_STATUS_PACKET)
-        # wait challenge response
-        for packet in self.read_iterator(self.CHALLENGE_TIMEOUT):
-            if packet.startswith(STATUS_RESPONSE_HEADER):
-                return packet
-
-    def getstatus(self):
+        packet, _ = self.request(
+            QUAKE_STATUS_PACKET,
+            lambda p: packet_startswith(p, STATUS_RESPONSE_HEADER),
+            self.CHALLENGE_TIMEOUT)
+        return packet
+
+    def getstatus(self, players=True, lazy=False):
+        """Returns tuple (server vars, players), players are not parsed and
+        None is returned instead of them if players is False. If lazy is
+        True then StatusResponse is returned instead of tuple"""
         packet = self.getstatus_packet()
         if packet is None:
             return None
-        return parse_status_packet(packet, self.player_factory)
+        if lazy:
+            return StatusResponse(packet, self.player_factory)
+        return parse_status_packet(packet, self.player_factory, players)
+
+    @connection_required
+    def getinfo(self):
+        """Returns dict of server vars from infoResponse, it is much smaller
+        than status response and does not contain players
+
+        Response with other challenge (for example reply to previous
+        request) is ignored.
+        """
+        challenge = make_query_challenge()
+        packet, _ = self.request(
+            info_packet(challenge),
+            lambda p: is_info_response(p, challenge),
+            self.CHALLENGE_TIMEOUT)
+        return parse_info_packet(packet)
 
     def _ping(self, ping_packet, pong_packet, timeout=1):
-        self.sock.send(ping_packet)
-        # wait pong packet
-        start = time.time()
         try:
-            for packet in self.read_iterator(timeout):
-                if packet == pong_packet:
-                    return time.time() - start
+            _, rtt = self.request(ping_packet, lambda p: p == pong_packet,
+                                  timeout)
         except socket.timeout:
             return None
 
+        return rtt
+
     @connection_required
     def ping2(self, timeout=1):
         return self._ping(PING_Q2_PACKET, PONG_Q2_PACKET, timeout)
@@ -130,6 +294,54 @@ class QuakeProtocol(object):
         return cls(host, port, *args, **kwargs)
 
 
+class ChallengePool(object):
+    """Prefetched challenges for secure challenge based rcon
+
+    Challenge is requested right after command is sent and its response is
+    collected while command output is read, so next command does not need
+    additional round trip.
+    """
+
+    def __init__(self, size=1, ttl=5):
+        """ size --- maximum number of stored challenges, note that
+        darkplaces keeps only one challenge per client address
+        ttl --- seconds after which challenge is considered stale
+        """
+        self.size = size
+        self.ttl = ttl
+        self.challenges = collections.deque()
+        self.pending = 0
+
+    def __len__(self):
+        return len(self.challenges)
+
+    def put(self, challenge):
+        "Store challenge, darkplaces repeats it until it is used"
+        self.pending = max(self.pending - 1, 0)
+        # repeated challenge replaces stored one, it could be used once
+        self.challenges = collections.deque(
+            item for item in self.challenges if item[0] != challenge)
+        self.challenges.append((challenge, monotonic_time() + self.ttl))
+        while len(self.challenges) > self.size:
+            self.challenges.popleft()
+
+    def get(self):
+        "Returns fresh challenge or None"
+        now = monotonic_time()
+        while self.challenges:
+            challenge, expire_time = self.challenges.popleft()
+            if expire_time > now:
+                return challenge
+
+    def wanted(self):
+        "Number of challenges which should be requested"
+        return max(self.size - len(self.challenges) - self.pending, 0)
+
+    def clear(self):
+        self.challenges.clear()
+        self.pending = 0
+
+
 class XRcon(QuakeProtocol):
 
     RCON_NOSECURE = 0
@@ -144,19 +356,24 @@ class XRcon(QuakeProtocol):
     ])
 
     _secure_rcon = RCON_SECURE_TIME
+    rate_limiter = None
+    "optional xrcon.ratelimit.RateLimiter, send waits for its permission"
 
     def __init__(self, host, port, password, secure_rcon=RCON_SECURE_TIME,
-                 timeout=0.7):
+                 timeout=0.7, challenge_pool=None):
         """ host --- ip address or domain of server
         port --- udp port of server
         password --- rcon password
         secure_rcon --- type of rcon connection, default secure rcon, use 0
         for old quake servers
         timeout --- socket timeout
+        challenge_pool --- optional ChallengePool, used only by secure
+        challenge based rcon
         """
         super(XRcon, self).__init__(host, port, timeout)
         self.password = password
         self.secure_rcon = secure_rcon
+        self.challenge_pool = challenge_pool
 
     @property
     def secure_rcon(self):
@@ -170,47 +387,284 @@ class XRcon(QuakeProtocol):
 
         self._secure_rcon = value
 
+    @property
+    def password(self):
+        "Rcon password"
+        return self._password
+
+    @password.setter
+    def password(self, value):
+        self._password = value
+        self._signer = None
+
+    @property
+    def signer(self):
+        "RconSigner for current password, created once per password"
+        if self._signer is None:
+            self._signer = RconSigner(self.password)
+
+        return self._signer
+
+    def close(self):
+        super(XRcon, self).close()
+        if self.challenge_pool is not None:
+            self.challenge_pool.clear()
+
+    def collect_challenge(self, packet):
+        "Put prefetched challenge to pool, returns True if packet was used"
+        pool = self.challenge_pool
+        if pool is not None and pool.pending > 0 and \
+                packet_startswith(packet, CHALLENGE_RESPONSE_HEADER):
+            pool.put(bytes(parse_challenge_response(packet)))
+            return True
+
+        return False
+
     @connection_required
-    def send(self, command):
-        "Send rcon command to server"
+    def read_iterator(self, timeout=3):
+        for packet in super(XRcon, self).read_iterator(timeout):
+            if not self.collect_challenge(packet):
+                yield packet
+
+    @connection_required
+    def read_view_iterator(self, timeout=3):
+        for packet in super(XRcon, self).read_view_iterator(timeout):
+            if not self.collect_challenge(packet):
+                yield packet
+
+    @connection_required
+    def getchallenge(self, output=None):
+        """Return server challenge, prefetched one is used if available
+
+        Args:
+            output --- optional bytearray, rcon output received while
+            waiting for challenge is appended to it instead of being dropped
+        """
+        if self.challenge_pool is not None:
+            challenge = self.challenge_pool.get()
+            if challenge is not None:
+                return challenge
+
+            # response for prefetch request could be lost, so don't wait it
+            self.challenge_pool.pending = 0
+
+        if output is None:
+            return super(XRcon, self).getchallenge()
+
+        def is_response(packet):
+            if packet_startswith(packet, RCON_RESPONSE_HEADER):
+                output.extend(parse_rcon_response(packet))
+                return False
+
+            return packet_startswith(packet, CHALLENGE_RESPONSE_HEADER)
+
+        packet, _ = self.request(CHALLENGE_PACKET, is_response,
+                                 self.CHALLENGE_TIMEOUT)
+        return parse_challenge_response(packet)
+
+    @connection_required
+    def prefetch_challenges(self):
+        "Request challenges for pool, responses are collected during reads"
+        pool = self.challenge_pool
+        if pool is None:
+            return
+
+        for i in range(pool.wanted()):
+            self.sock.send(CHALLENGE_PACKET)
+            pool.pending += 1
+
+    @connection_required
+    def throttle(self):
+        "Wait until rate limiter allows to send command"
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire((self.host, self.port))
+
+    @connection_required
+    def send(self, command, output=None):
+        """Send rcon command to server
+
+        Args:
+            command --- rcon command
+            output --- optional bytearray for rcon output received while
+            waiting for challenge
+        """
+        self.throttle()
         if self.secure_rcon == self.RCON_NOSECURE:
             self.sock.send(rcon_nosecure_packet(self.password, command))
         elif self.secure_rcon == self.RCON_SECURE_TIME:
-            self.sock.send(rcon_secure_time_packet(self.password, command))
+            self.sock.send(self.signer.time_packet(command))
         elif self.secure_rcon == self.RCON_SECURE_CHALLENGE:
-            challenge = self.getchallenge()
-            self.sock.send(rcon_secure_challenge_packet(self.password,
-                                                        challenge, command))
+            challenge = self.getchallenge() if output is None else \
+                self.getchallenge(output)
+            self.sock.send(self.signer.challenge_packet(challenge, command))
+            self.prefetch_challenges()
         else:
             raise ValueError("Bad value of secure_rcon")
 
+    def max_command_size(self):
+        "Maximum size of command which fits to one packet"
+        if self.secure_rcon == self.RCON_NOSECURE:
+            packet = rcon_nosecure_packet(self.password, '')
+        elif self.secure_rcon == self.RCON_SECURE_TIME:
+            packet = self.signer.time_packet('')
+        else:
+            packet = self.signer.challenge_packet(six.b('0' * 11), '')
+
+        return MAX_PACKET_SIZE - len(packet)
+
+    @connection_required
+    def send_batch(self, commands, output=None):
+        """Join commands to packets as large as possible and send them
+
+        Args:
+            commands --- list of commands
+            output --- optional bytearray, output of already sent packets
+            received while waiting for challenges is appended to it
+
+        Returns: number of sent packets
+        """
+        lines = pack_commands(commands, self.max_command_size())
+        for line in lines:
+            self.send(line, output)
+
+        return len(lines)
+
+    @connection_required
+    def execute_batch(self, commands, timeout=1, sentinel=False):
+        """Execute many commands with few packets, output is read once
+        Args:
+            commands --- list of commands
+            timeout --- read timeout
+            sentinel --- stop reading when output of unique echo command,
+            which is executed after all commands, is received
+
+        Returns: bytes response of all commands
+        """
+        commands = list(commands)
+        # with challenge based rcon output of first packets could arrive
+        # while challenges for next ones are requested
+        data = bytearray()
+        if not sentinel:
+            self.send_batch(commands, data)
+            return self.read_untill(timeout, data)
+
+        token = make_sentinel()
+        echo = six.b('echo ') + token
+        if not commands or not isinstance(commands[-1], six.binary_type):
+            echo = echo.decode('ascii')
+
+        self.send_batch(commands + [echo], data)
+        return self.read_until_sentinel(token, timeout, data)
+
     @connection_required
     def read_once(self, timeout=2):
-        for packet in self.read_iterator(timeout):
-            if packet.startswith(RCON_RESPONSE_HEADER):
-                return parse_rcon_response(packet)
+        for packet in self.read_view_iterator(timeout):
+            if packet_startswith(packet, RCON_RESPONSE_HEADER):
+                return parse_rcon_response(packet).tobytes()
 
     @connection_required
-    def read_untill(self, timeout=1):
-        data = []
+    def read_untill(self, timeout=1, data=None):
+        # packets are received to reusable buffer and their payload is
+        # copied only to result buffer
+        if data is None:
+            data = bytearray()
+
+        try:
+            for packet in self.read_view_iterator(timeout):
+                if packet_startswith(packet, RCON_RESPONSE_HEADER):
+                    data += parse_rcon_response(packet)
+        except socket.timeout:
+            pass
+
+        if data:
+            return bytes(data)
+
+    @connection_required
+    def read_until_sentinel(self, sentinel, timeout=1, data=None):
+        """Read response until echoed sentinel line or timeout
+
+        Args:
+            sentinel --- echoed token
+            timeout --- read timeout
+            data --- optional bytearray with already received output
+
+        Returns: bytes response without sentinel line
+        """
+        if data is None:
+            data = bytearray()
+
+        line = sentinel + six.b('\n')
         try:
-            for packet in self.read_iterator(timeout):
-                if packet.startswith(RCON_RESPONSE_HEADER):
-                    data.append(parse_rcon_response(packet))
+            for packet in self.read_view_iterator(timeout):
+                if packet_startswith(packet, RCON_RESPONSE_HEADER):
+                    data += parse_rcon_response(packet)
+                    # sentinel line could be splitted by several packets
+                    if data.endswith(line):
+                        break
         except socket.timeout:
             pass
 
+        if data.endswith(line):
+            del data[-len(line):]
+
         if data:
-            return six.b('').join(data)
+            return bytes(data)
 
     @connection_required
-    def execute(self, command, timeout=1):
+    def stream(self, command, timeout=1, sentinel=False, encoding='utf8'):
+        """Execute rcon command and yield lines of output as soon as they
+        are received
+        Args:
+            command --- executed command
+            timeout --- read timeout
+            sentinel --- stop when output of appended echo is received
+            encoding --- output encoding
+
+        Yields: text lines with trailing newline, last line may have no
+        newline
+        """
+        token_line = None
+        if sentinel:
+            token = make_sentinel()
+            token_line = token.decode('ascii') + six.u('\n')
+            command = append_sentinel(command, token)
+
+        self.send(command)
+        decoder = LineDecoder(encoding)
+        try:
+            for packet in self.read_view_iterator(timeout):
+                if packet_startswith(packet, RCON_RESPONSE_HEADER):
+                    for line in decoder.feed(parse_rcon_response(packet)):
+                        if token_line and line.endswith(token_line):
+                            line = line[:-len(token_line)]
+                            if line:
+                                yield line
+                            return
+
+                        yield line
+        except socket.timeout:
+            pass
+
+        tail = decoder.flush()
+        if tail:
+            yield tail
+
+    @connection_required
+    def execute(self, command, timeout=1, sentinel=False):
         """Execute rcon command on server and fetch result
         Args:
             command --- executed command
             timeout --- read timeout
+            sentinel --- if True then unique echo command is appended and
+            reading is stopped as soon as its output is received, instead
+            of waiting for timeout
 
         Returns: bytes response
         """
+        if sentinel:
+            token = make_sentinel()
+            self.send(append_sentinel(command, token))
+            return self.read_until_sentinel(token, timeout)
+
         self.send(command)
         return self.read_untill(timeout)
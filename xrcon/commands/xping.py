@@ -3,22 +3,14 @@ import socket
 import select
 import errno
 import math
-import time
-import six
 from collections import namedtuple
 from .base import BaseProgram
 from ..utils import (
     PING_Q2_PACKET, PONG_Q2_PACKET, PING_QFUSION_PACKET, PONG_QFUSION_PACKET,
-    PING_Q3_PACKET, PONG_Q3_PACKET, MAX_PACKET_SIZE
+    PING_Q3_PACKET, PONG_Q3_PACKET, MAX_PACKET_SIZE, monotonic_time
 )
 
 
-if six.PY3:  # pragma: no cover
-    monotonic_time = time.monotonic
-else:   # pragma: no cover
-    monotonic_time = time.time
-
-
 PingProtocol = namedtuple('PingProtocol', ['ping', 'pong'])
 
 
@@ -39,6 +31,7 @@ class XPingProgram(BaseProgram):
         'qfusion': QFUSION_PROTOCOL
     }
     default_ping_protocol = 'q2'
+    resolver = None
 
     def __init__(self):
         super(XPingProgram, self).__init__()
@@ -67,8 +60,10 @@ class XPingProgram(BaseProgram):
         self.execute(namespace)
 
     def find_server(self, namespace):
+        getaddrinfo = socket.getaddrinfo if self.resolver is None \
+            else self.resolver.getaddrinfo
         try:
-            servers = socket.getaddrinfo(
+            servers = getaddrinfo(
                 namespace.server,
                 namespace.port,
                 namespace.proto,
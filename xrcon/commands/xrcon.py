@@ -32,44 +32,102 @@ class XRconProgram(BaseProgram):
 
     def execute(self, namespace):
         config = self.parse_config(namespace.config)
+        names = namespace.name or [None]
+        if len(names) > 1:
+            return self.execute_many(namespace, config, names)
+
+        rcon, cargs = self.create_rcon(config, namespace, names[0])
+        try:
+            rcon.connect()
+            try:
+                for line in rcon.stream(self.command(namespace),
+                                        cargs['timeout']):
+                    self.write(line)
+            finally:
+                rcon.close()
+        except socket.error as e:
+            self.parser.error(str(e))
+
+    def execute_many(self, namespace, config, names):
+        "Execute command on servers from several config sections at once"
+        try:
+            from ..aio import AsyncXRcon, iter_execute_many
+        except (ImportError, SyntaxError):
+            self.parser.error("several names require python 3.6+")
+
+        rcon_names = {}
+        for name in names:
+            rcon, _ = self.create_rcon(config, namespace, name, AsyncXRcon)
+            rcon_names[rcon] = name
+
+        results = iter_execute_many(rcon_names.keys(), self.command(namespace),
+                                    concurrency=namespace.jobs)
+        for result in results:
+            name = rcon_names[result.rcon]
+            if result.error is not None:
+                self.write(six.u("[{name}] error: {error}\n").format(
+                    name=name, error=result.error))
+                continue
+
+            self.write(six.u("[{name}] {time_ms:0.2f} ms\n").format(
+                name=name, time_ms=result.latency * 1000))
+            if result.output:
+                # quake charset names are not valid utf8 sometimes
+                self.write(result.output.decode('utf8', 'replace'))
+
+    def create_rcon(self, config, namespace, name, rcon_class=None):
+        if rcon_class is None:
+            rcon_class = XRcon
+
         try:
-            cargs = self.rcon_args(config, namespace, namespace.name)
+            cargs = self.rcon_args(config, namespace, name)
         except (NoOptionError, NoSectionError, ValueError) as e:
             message = "Bad configuratin file: {msg}".format(msg=str(e))
             self.parser.error(message)
 
         try:
-            rcon = XRcon \
+            rcon = rcon_class \
                 .create_by_server_str(cargs['server'], cargs['password'],
                                       cargs['type'], cargs['timeout'])
         except ValueError as e:
             self.parser.error(str(e))
 
-        try:
-            rcon.connect()
-            try:
-                data = rcon.execute(self.command(namespace), cargs['timeout'])
-                if data:
-                    self.write(data.decode('utf8'))
-            finally:
-                rcon.close()
-        except socket.error as e:
-            self.parser.error(str(e))
+        return rcon, cargs
 
     def write(self, message):
         assert isinstance(message, six.text_type), "Bad text type"
         sys.stdout.write(message)
+        sys.stdout.flush()
 
     @staticmethod
     def command(namespace):
         return six.u(' ').join(namespace.command)
 
+    @staticmethod
+    def jobs_validator(jobs_str):
+        try:
+            jobs_val = int(jobs_str)
+        except ValueError:
+            raise argparse.ArgumentTypeError("jobs should be integer")
+        else:
+            if jobs_val >= 1:
+                return jobs_val
+            else:
+                msg = "jobs should be one or more"
+                raise argparse.ArgumentTypeError(msg)
+
     @classmethod
     def build_parser(cls):
         parser = super(XRconProgram, cls).build_parser()
         parser.add_argument('--config', type=argparse.FileType('r'))
         parser.add_argument('--timeout', type=float)
-        parser.add_argument('-n', '--name')
+        parser.add_argument('-n', '--name', action='append',
+                            help='config section, repeat it to execute'
+                                 ' command on several servers at once')
+        parser.add_argument('-j', '--jobs', type=cls.jobs_validator,
+                            default=64,
+                            help='maximum number of servers queried'
+                                 ' simultaneously')
         parser.add_argument('-s', '--server')
         parser.add_argument('-p', '--password')
         parser.add_argument('-t', '--type', type=int, choices=XRcon.RCON_TYPES)
@@ -0,0 +1,176 @@
+"""Change events between status snapshots
+
+Example:
+
+    diff = StatusDiff()
+    while True:
+        for event in diff.update_packet(server, qc.getstatus_packet()):
+            print(event.kind, event.key, event.old, event.new)
+        time.sleep(2)
+"""
+import collections
+from .utils import parse_status_packet, Player
+
+
+StatusEvent = collections.namedtuple('StatusEvent',
+                                     ['server', 'kind', 'key', 'old', 'new'])
+StatusEvent.__doc__ = """Change of server status
+
+server --- server key passed to StatusDiff.update
+kind --- one of StatusDiff.EVENT_KINDS
+key --- player name or server var name
+old, new --- old and new values: Player for join and leave events (None
+for missing side), integers for frags and ping, names for name and bytes
+for var events (None if var is added or removed)
+"""
+
+
+Snapshot = collections.namedtuple('Snapshot',
+                                  ['packet', 'server_vars', 'players'])
+
+
+def match_players(old_players, new_players):
+    """Match players of two snapshots
+
+    Players are matched by name, players with same name are matched in
+    order of their slots. Renamed player keeps its slot, so not matched old
+    player is paired with first not matched new player with same frags and
+    same position in slot order, i.e. with same number of matched players
+    before it. Such players are considered renamed, others left and joined.
+
+    Returns: tuple (matched pairs, renamed pairs, left, joined)
+    """
+    by_name = collections.defaultdict(collections.deque)
+    for index, player in enumerate(old_players):
+        by_name[player.name].append((index, player))
+
+    matched = []
+    joined = []  # (number of matched players before, player)
+    old_matched = set()
+    for player in new_players:
+        same_name = by_name.get(player.name)
+        if same_name:
+            index, old = same_name.popleft()
+            old_matched.add(index)
+            matched.append((old, player))
+        else:
+            joined.append((len(matched), player))
+
+    left = []
+    position = 0
+    for index, player in enumerate(old_players):
+        if index in old_matched:
+            position += 1
+        else:
+            left.append((position, player))
+
+    renamed = []
+    still_left = []
+    for position, old in left:
+        for index, (new_position, new) in enumerate(joined):
+            if new_position == position and new.frags == old.frags:
+                renamed.append((old, new))
+                del joined[index]
+                break
+        else:
+            still_left.append(old)
+
+    return matched, renamed, still_left, [player for _, player in joined]
+
+
+class StatusDiff(object):
+    """Keeps last status of every server and returns only changes
+
+    First update of server returns join and var events for whole status.
+    """
+
+    JOIN = 'join'
+    LEAVE = 'leave'
+    FRAGS = 'frags'
+    PING = 'ping'
+    NAME = 'name'
+    VAR = 'var'
+    EVENT_KINDS = frozenset([JOIN, LEAVE, FRAGS, PING, NAME, VAR])
+
+    player_factory = Player.parse_player
+
+    def __init__(self):
+        self.snapshots = {}
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def update_packet(self, server, packet):
+        """Update server status from status response packet
+
+        Returns: list of StatusEvent, packet same as previous one is not
+        parsed
+        """
+        packet = bytes(packet)
+        snapshot = self.snapshots.get(server)
+        if snapshot is not None and snapshot.packet == packet:
+            return []
+
+        server_vars, players = parse_status_packet(packet,
+                                                   self.player_factory)
+        return self.update(server, server_vars, players, packet)
+
+    def update(self, server, server_vars, players, packet=None):
+        """Update server status from parse_status_packet result
+
+        Returns: list of StatusEvent
+        """
+        players = list(players)
+        snapshot = self.snapshots.get(server)
+        self.snapshots[server] = Snapshot(packet, server_vars, players)
+        if snapshot is None:
+            snapshot = Snapshot(None, {}, [])
+
+        events = self.diff_vars(server, snapshot.server_vars, server_vars)
+        events.extend(self.diff_players(server, snapshot.players, players))
+        return events
+
+    def diff_vars(self, server, old_vars, new_vars):
+        events = []
+        for key, value in new_vars.items():
+            old_value = old_vars.get(key)
+            if old_value != value:
+                events.append(StatusEvent(server, self.VAR, key, old_value,
+                                          value))
+
+        for key, value in old_vars.items():
+            if key not in new_vars:
+                events.append(StatusEvent(server, self.VAR, key, value, None))
+
+        return events
+
+    def diff_players(self, server, old_players, new_players):
+        matched, renamed, left, joined = match_players(old_players,
+                                                       new_players)
+        events = []
+        for old, new in renamed:
+            events.append(StatusEvent(server, self.NAME, new.name, old.name,
+                                      new.name))
+            matched.append((old, new))
+
+        for old, new in matched:
+            if old.frags != new.frags:
+                events.append(StatusEvent(server, self.FRAGS, new.name,
+                                          old.frags, new.frags))
+            if old.ping != new.ping:
+                events.append(StatusEvent(server, self.PING, new.name,
+                                          old.ping, new.ping))
+
+        for player in left:
+            events.append(StatusEvent(server, self.LEAVE, player.name, player,
+                                      None))
+
+        for player in joined:
+            events.append(StatusEvent(server, self.JOIN, player.name, None,
+                                      player))
+
+        return events
+
+    def forget(self, server):
+        "Remove snapshot of server, next update starts from scratch"
+        self.snapshots.pop(server, None)
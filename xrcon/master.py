@@ -0,0 +1,118 @@
+"""Query master servers for list of game servers
+
+Example:
+
+    query = MasterQuery(['dpmaster.deathmask.net'], 'Xonotic', ext=True)
+    for host, port in query:
+        print(host, port)
+"""
+from .client import QuakeProtocol
+from .mux import Multiplexer
+from .utils import (
+    getservers_packet,
+    parse_master_response,
+    parse_server_addr,
+    monotonic_time
+)
+
+
+DEFAULT_MASTER_PORT = 27950
+
+
+class MasterQuery(object):
+    """Queries many master servers in parallel over shared socket
+
+    Iteration yields (ip, port) of servers as packets arrive, every server
+    is yielded once even if it is returned by many masters. Master is
+    finished when it sends packet terminated by EOT, iteration stops when
+    all masters are finished or timeout is expired.
+    """
+
+    multiplexer_class = Multiplexer
+
+    def __init__(self, masters, game, protocol=3, filters=('empty', 'full'),
+                 ext=False, timeout=3):
+        """ masters --- master server strings like "host:port"
+        game, protocol, filters, ext --- passed to getservers_packet
+        timeout --- seconds for whole query
+        """
+        self.masters = [parse_server_addr(master, DEFAULT_MASTER_PORT)
+                        for master in masters]
+        self.packet = getservers_packet(game, protocol, filters, ext)
+        self.timeout = timeout
+        self.servers = set()
+        self.finished = set()
+        self.errors = {}  # master -> exception, for bad packets and lookups
+
+    def __iter__(self):
+        return self.run()
+
+    @property
+    def pending(self):
+        "Masters without EOT, so their lists could be incomplete"
+        return [master for master in self.masters
+                if master not in self.finished]
+
+    def run(self):
+        mux = self.multiplexer_class()
+        try:
+            sessions = {}
+            for master in self.masters:
+                try:
+                    family, _, _, _, sockaddr = \
+                        QuakeProtocol.best_connection_params(
+                            master[0], master[1], QuakeProtocol.resolver)
+                    session = mux.register(family, sockaddr)
+                except (IOError, ValueError) as e:
+                    self.errors[master] = e
+                    continue
+
+                session.send(self.packet)
+                sessions[master] = session
+
+            deadline = monotonic_time() + self.timeout
+            while len(self.finished) < len(sessions):
+                time_left = deadline - monotonic_time()
+                if time_left <= 0:
+                    break
+
+                mux.poll(time_left)
+                for master, session in sessions.items():
+                    while session.packets:
+                        for server in self.dispatch(master,
+                                                    session.packets.popleft()):
+                            yield server
+        finally:
+            mux.close()
+
+    def dispatch(self, master, packet):
+        "Process packet of master, returns list of not seen servers"
+        if master in self.finished:
+            return []
+
+        try:
+            servers, last = parse_master_response(packet)
+        except ValueError as e:
+            self.errors[master] = e
+            return []
+
+        if last:
+            self.finished.add(master)
+
+        new_servers = []
+        for server in servers:
+            if server not in self.servers:
+                self.servers.add(server)
+                new_servers.append(server)
+
+        return new_servers
+
+
+def query_masters(masters, game, protocol=3, filters=('empty', 'full'),
+                  ext=False, timeout=3):
+    "Returns set of servers addresses from all masters"
+    query = MasterQuery(masters, game, protocol, filters, ext, timeout)
+    for server in query:
+        pass
+
+    return query.servers
@@ -0,0 +1,210 @@
+"""Pure python MD4 (RFC 1320)
+
+Used as fallback when hashlib has no MD4, for example with OpenSSL 3.0
+where MD4 is moved to legacy provider. Object has same interface as hashlib
+objects, so it could be passed as digestmod to hmac.new.
+"""
+import binascii
+import struct
+import six
+
+
+MASK = 0xFFFFFFFF
+INITIAL_STATE = (0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476)
+BLOCK = struct.Struct('<16I')
+LENGTH = struct.Struct('<Q')
+DIGEST = struct.Struct('<4I')
+
+
+def compress(state, data, offset=0):
+    """Process one 64 bytes block of data starting from offset
+
+    Rounds are unrolled and message words are kept in local variables,
+    this is much faster than loops over lists in python.
+
+    Returns: new state tuple
+    """
+    a, b, c, d = state
+    (x0, x1, x2, x3, x4, x5, x6, x7,
+     x8, x9, x10, x11, x12, x13, x14, x15) = BLOCK.unpack_from(data, offset)
+
+    # round 1
+    a = (a + ((b & c) | (~b & d)) + x0) & MASK
+    a = ((a << 3) | (a >> 29)) & MASK
+    d = (d + ((a & b) | (~a & c)) + x1) & MASK
+    d = ((d << 7) | (d >> 25)) & MASK
+    c = (c + ((d & a) | (~d & b)) + x2) & MASK
+    c = ((c << 11) | (c >> 21)) & MASK
+    b = (b + ((c & d) | (~c & a)) + x3) & MASK
+    b = ((b << 19) | (b >> 13)) & MASK
+    a = (a + ((b & c) | (~b & d)) + x4) & MASK
+    a = ((a << 3) | (a >> 29)) & MASK
+    d = (d + ((a & b) | (~a & c)) + x5) & MASK
+    d = ((d << 7) | (d >> 25)) & MASK
+    c = (c + ((d & a) | (~d & b)) + x6) & MASK
+    c = ((c << 11) | (c >> 21)) & MASK
+    b = (b + ((c & d) | (~c & a)) + x7) & MASK
+    b = ((b << 19) | (b >> 13)) & MASK
+    a = (a + ((b & c) | (~b & d)) + x8) & MASK
+    a = ((a << 3) | (a >> 29)) & MASK
+    d = (d + ((a & b) | (~a & c)) + x9) & MASK
+    d = ((d << 7) | (d >> 25)) & MASK
+    c = (c + ((d & a) | (~d & b)) + x10) & MASK
+    c = ((c << 11) | (c >> 21)) & MASK
+    b = (b + ((c & d) | (~c & a)) + x11) & MASK
+    b = ((b << 19) | (b >> 13)) & MASK
+    a = (a + ((b & c) | (~b & d)) + x12) & MASK
+    a = ((a << 3) | (a >> 29)) & MASK
+    d = (d + ((a & b) | (~a & c)) + x13) & MASK
+    d = ((d << 7) | (d >> 25)) & MASK
+    c = (c + ((d & a) | (~d & b)) + x14) & MASK
+    c = ((c << 11) | (c >> 21)) & MASK
+    b = (b + ((c & d) | (~c & a)) + x15) & MASK
+    b = ((b << 19) | (b >> 13)) & MASK
+    # round 2
+    a = (a + ((b & c) | (b & d) | (c & d)) + x0 + 0x5A827999) & MASK
+    a = ((a << 3) | (a >> 29)) & MASK
+    d = (d + ((a & b) | (a & c) | (b & c)) + x4 + 0x5A827999) & MASK
+    d = ((d << 5) | (d >> 27)) & MASK
+    c = (c + ((d & a) | (d & b) | (a & b)) + x8 + 0x5A827999) & MASK
+    c = ((c << 9) | (c >> 23)) & MASK
+    b = (b + ((c & d) | (c & a) | (d & a)) + x12 + 0x5A827999) & MASK
+    b = ((b << 13) | (b >> 19)) & MASK
+    a = (a + ((b & c) | (b & d) | (c & d)) + x1 + 0x5A827999) & MASK
+    a = ((a << 3) | (a >> 29)) & MASK
+    d = (d + ((a & b) | (a & c) | (b & c)) + x5 + 0x5A827999) & MASK
+    d = ((d << 5) | (d >> 27)) & MASK
+    c = (c + ((d & a) | (d & b) | (a & b)) + x9 + 0x5A827999) & MASK
+    c = ((c << 9) | (c >> 23)) & MASK
+    b = (b + ((c & d) | (c & a) | (d & a)) + x13 + 0x5A827999) & MASK
+    b = ((b << 13) | (b >> 19)) & MASK
+    a = (a + ((b & c) | (b & d) | (c & d)) + x2 + 0x5A827999) & MASK
+    a = ((a << 3) | (a >> 29)) & MASK
+    d = (d + ((a & b) | (a & c) | (b & c)) + x6 + 0x5A827999) & MASK
+    d = ((d << 5) | (d >> 27)) & MASK
+    c = (c + ((d & a) | (d & b) | (a & b)) + x10 + 0x5A827999) & MASK
+    c = ((c << 9) | (c >> 23)) & MASK
+    b = (b + ((c & d) | (c & a) | (d & a)) + x14 + 0x5A827999) & MASK
+    b = ((b << 13) | (b >> 19)) & MASK
+    a = (a + ((b & c) | (b & d) | (c & d)) + x3 + 0x5A827999) & MASK
+    a = ((a << 3) | (a >> 29)) & MASK
+    d = (d + ((a & b) | (a & c) | (b & c)) + x7 + 0x5A827999) & MASK
+    d = ((d << 5) | (d >> 27)) & MASK
+    c = (c + ((d & a) | (d & b) | (a & b)) + x11 + 0x5A827999) & MASK
+    c = ((c << 9) | (c >> 23)) & MASK
+    b = (b + ((c & d) | (c & a) | (d & a)) + x15 + 0x5A827999) & MASK
+    b = ((b << 13) | (b >> 19)) & MASK
+    # round 3
+    a = (a + (b ^ c ^ d) + x0 + 0x6ED9EBA1) & MASK
+    a = ((a << 3) | (a >> 29)) & MASK
+    d = (d + (a ^ b ^ c) + x8 + 0x6ED9EBA1) & MASK
+    d = ((d << 9) | (d >> 23)) & MASK
+    c = (c + (d ^ a ^ b) + x4 + 0x6ED9EBA1) & MASK
+    c = ((c << 11) | (c >> 21)) & MASK
+    b = (b + (c ^ d ^ a) + x12 + 0x6ED9EBA1) & MASK
+    b = ((b << 15) | (b >> 17)) & MASK
+    a = (a + (b ^ c ^ d) + x2 + 0x6ED9EBA1) & MASK
+    a = ((a << 3) | (a >> 29)) & MASK
+    d = (d + (a ^ b ^ c) + x10 + 0x6ED9EBA1) & MASK
+    d = ((d << 9) | (d >> 23)) & MASK
+    c = (c + (d ^ a ^ b) + x6 + 0x6ED9EBA1) & MASK
+    c = ((c << 11) | (c >> 21)) & MASK
+    b = (b + (c ^ d ^ a) + x14 + 0x6ED9EBA1) & MASK
+    b = ((b << 15) | (b >> 17)) & MASK
+    a = (a + (b ^ c ^ d) + x1 + 0x6ED9EBA1) & MASK
+    a = ((a << 3) | (a >> 29)) & MASK
+    d = (d + (a ^ b ^ c) + x9 + 0x6ED9EBA1) & MASK
+    d = ((d << 9) | (d >> 23)) & MASK
+    c = (c + (d ^ a ^ b) + x5 + 0x6ED9EBA1) & MASK
+    c = ((c << 11) | (c >> 21)) & MASK
+    b = (b + (c ^ d ^ a) + x13 + 0x6ED9EBA1) & MASK
+    b = ((b << 15) | (b >> 17)) & MASK
+    a = (a + (b ^ c ^ d) + x3 + 0x6ED9EBA1) & MASK
+    a = ((a << 3) | (a >> 29)) & MASK
+    d = (d + (a ^ b ^ c) + x11 + 0x6ED9EBA1) & MASK
+    d = ((d << 9) | (d >> 23)) & MASK
+    c = (c + (d ^ a ^ b) + x7 + 0x6ED9EBA1) & MASK
+    c = ((c << 11) | (c >> 21)) & MASK
+    b = (b + (c ^ d ^ a) + x15 + 0x6ED9EBA1) & MASK
+    b = ((b << 15) | (b >> 17)) & MASK
+    return ((state[0] + a) & MASK, (state[1] + b) & MASK,
+            (state[2] + c) & MASK, (state[3] + d) & MASK)
+
+
+class MD4(object):
+    "hashlib compatible MD4 object"
+
+    name = 'md4'
+    digest_size = 16
+    block_size = 64
+
+    def __init__(self, data=six.b('')):
+        self.state = INITIAL_STATE
+        self.buffer = six.b('')
+        self.length = 0
+        if data:
+            self.update(data)
+
+    def update(self, data):
+        data = self.buffer + bytes(data)
+        self.length += len(data) - len(self.buffer)
+        state = self.state
+        end = len(data) - len(data) % 64
+        for offset in range(0, end, 64):
+            state = compress(state, data, offset)
+
+        self.state = state
+        self.buffer = data[end:]
+
+    def digest(self):
+        tail = self.buffer + six.b('\x80') + \
+            six.b('\x00') * ((55 - len(self.buffer)) % 64) + \
+            LENGTH.pack((self.length << 3) & 0xFFFFFFFFFFFFFFFF)
+        state = self.state
+        for offset in range(0, len(tail), 64):
+            state = compress(state, tail, offset)
+
+        return DIGEST.pack(*state)
+
+    def hexdigest(self):
+        return binascii.hexlify(self.digest()).decode('ascii')
+
+    def copy(self):
+        other = MD4.__new__(MD4)
+        other.state = self.state
+        other.buffer = self.buffer
+        other.length = self.length
+        return other
+
+
+def new(data=six.b('')):
+    return MD4(data)
+
+
+# outer HMAC hash always processes pad block and inner digest, so its last
+# block is inner digest followed by constant padding
+OUTER_PADDING = six.b('\x80') + six.b('\x00') * 39 + LENGTH.pack((64 + 16) * 8)
+
+
+def hmac_many(key, messages):
+    """Returns list of HMAC-MD4 digests of messages for one key
+
+    Faster than hmac module, inner and outer pads are hashed once and
+    outer hash is finished with one compression for every message.
+    """
+    key = bytes(key)
+    if len(key) > MD4.block_size:
+        key = MD4(key).digest()
+
+    key = bytearray(key.ljust(MD4.block_size, six.b('\x00')))
+    inner = MD4(bytes(bytearray(x ^ 0x36 for x in key)))
+    outer_state = compress(INITIAL_STATE,
+                           bytes(bytearray(x ^ 0x5C for x in key)))
+    digests = []
+    for msg in messages:
+        mac = inner.copy()
+        mac.update(msg)
+        digests.append(DIGEST.pack(*compress(
+            outer_state, mac.digest() + OUTER_PADDING)))
+
+    return digests
@@ -0,0 +1,190 @@
+"""Many client sessions over one shared UDP socket
+
+Example:
+
+    mux = Multiplexer()
+    rcons = [XRcon.create_by_server_str(addr, 'password') for addr in addrs]
+    for rcon in rcons:
+        rcon.connect(mux)
+    ...
+    mux.close()
+"""
+import collections
+import errno
+import select
+import socket
+import threading
+from .utils import MAX_PACKET_SIZE, monotonic_time
+
+
+def addr_key(sockaddr):
+    "IPv6 socket address also contains flowinfo and scope id, strip them"
+    return sockaddr[0], sockaddr[1]
+
+
+class MuxSocket(object):
+    """Socket like object which represents single session of Multiplexer,
+    it supports only methods used by QuakeProtocol"""
+
+    def __init__(self, mux, family, sockaddr):
+        self.mux = mux
+        self.family = family
+        self.sockaddr = sockaddr
+        self.packets = collections.deque()
+        self.timeout = None
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def gettimeout(self):
+        return self.timeout
+
+    def send(self, data):
+        return self.mux.sendto(self, data)
+
+    def recv(self, bufsize):
+        return self.mux.recv(self)[:bufsize]
+
+    def recv_into(self, buffer, nbytes=0):
+        packet = self.mux.recv(self)
+        size = min(len(packet), nbytes or len(buffer))
+        buffer[:size] = packet[:size]
+        return size
+
+    def close(self):
+        self.mux.unregister(self)
+
+
+class Multiplexer(object):
+    """Owns unconnected UDP sockets shared by many sessions, received
+    datagrams are dispatched to sessions by source address.
+
+    There is no dedicated receive thread, session which waits for data reads
+    shared sockets and dispatches packets for other sessions too, only one
+    thread reads sockets at a time.
+    """
+
+    def __init__(self, pool_size=1):
+        """ pool_size --- number of sockets per address family """
+        if pool_size < 1:
+            raise ValueError("pool_size should be positive")
+
+        self.pool_size = pool_size
+        self.sockets = {}
+        self.sessions = {}
+        self.cond = threading.Condition()
+        self.reading = False
+
+    def get_socket(self, family, sockaddr):
+        socks = self.sockets.get(family)
+        if socks is None:
+            socks = []
+            for i in range(self.pool_size):
+                sock = socket.socket(family, socket.SOCK_DGRAM)
+                sock.setblocking(False)
+                socks.append(sock)
+
+            self.sockets[family] = socks
+
+        return socks[hash(addr_key(sockaddr)) % self.pool_size]
+
+    def register(self, family, sockaddr):
+        "Create new session for server address"
+        key = addr_key(sockaddr)
+        with self.cond:
+            if key in self.sessions:
+                raise ValueError("Session for {0}:{1} already exists"
+                                 .format(*key))
+
+            # create shared sockets beforehand, so poll always has them
+            self.get_socket(family, sockaddr)
+            session = MuxSocket(self, family, sockaddr)
+            self.sessions[key] = session
+
+        return session
+
+    def unregister(self, session):
+        with self.cond:
+            self.sessions.pop(addr_key(session.sockaddr), None)
+
+    def sendto(self, session, data):
+        sock = self.get_socket(session.family, session.sockaddr)
+        return sock.sendto(data, session.sockaddr)
+
+    def recv(self, session):
+        "Wait packet for session, reads shared sockets if needed"
+        timeout_time = None
+        if session.timeout is not None:
+            timeout_time = monotonic_time() + session.timeout
+
+        while True:
+            time_left = None
+            if timeout_time is not None:
+                time_left = timeout_time - monotonic_time()
+
+            with self.cond:
+                if session.packets:
+                    return session.packets.popleft()
+
+                if time_left is not None and time_left <= 0:
+                    raise socket.timeout("timed out")
+
+                if self.reading:
+                    # other thread reads sockets, wait for its results
+                    self.cond.wait(time_left)
+                    continue
+
+                self.reading = True
+
+            try:
+                self.poll(time_left)
+            finally:
+                with self.cond:
+                    self.reading = False
+                    self.cond.notify_all()
+
+    def poll(self, timeout=None):
+        """Wait for data on shared sockets and dispatch received packets to
+        sessions, packets from unknown addresses are dropped
+
+        Returns: number of dispatched packets
+        """
+        socks = [sock for family_socks in self.sockets.values()
+                 for sock in family_socks]
+        if not socks:
+            return 0
+
+        rlst, _, _ = select.select(socks, [], [], timeout)
+        dispatched = 0
+        for sock in rlst:
+            for data, sockaddr in self.read_available(sock):
+                with self.cond:
+                    session = self.sessions.get(addr_key(sockaddr))
+                    if session is not None:
+                        session.packets.append(data)
+                        dispatched += 1
+
+        return dispatched
+
+    @staticmethod
+    def read_available(sock):
+        while True:
+            try:
+                yield sock.recvfrom(MAX_PACKET_SIZE)
+            except socket.error as e:
+                if e.errno in (errno.ECONNRESET, errno.ECONNREFUSED):
+                    # some systems report ICMP errors of previous sendto
+                    continue
+                if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    raise
+                return
+
+    def close(self):
+        "Close shared sockets"
+        with self.cond:
+            for socks in self.sockets.values():
+                for sock in socks:
+                    sock.close()
+
+            self.sockets = {}
+            self.sessions = {}
@@ -0,0 +1,291 @@
+"""Pipelined rcon commands
+
+Every command is bracketed by unique echo markers, so many commands could be
+in flight on one session and output is attributed to right command.
+
+Example:
+
+    pipeline = RconPipeline(rcon)
+    commands = [pipeline.submit('status'), pipeline.submit('cvarlist g_')]
+    pipeline.wait(timeout=2)
+    for command in commands:
+        print(command.output)
+"""
+import collections
+import socket
+import six
+from .client import QuakeProtocol, XRcon
+from .utils import (
+    make_sentinel,
+    monotonic_time,
+    packet_startswith,
+    parse_challenge_response,
+    parse_rcon_response,
+    CHALLENGE_PACKET,
+    CHALLENGE_RESPONSE_HEADER,
+    RCON_RESPONSE_HEADER
+)
+
+
+class PipelinedCommand(object):
+    "Future like result of command submitted to RconPipeline"
+
+    def __init__(self, pipeline, command):
+        self.pipeline = pipeline
+        self.command = command
+        self.begin = make_sentinel()
+        self.end = make_sentinel()
+        self.output = None
+        self.error = None
+        self.data = None  # bytearray, when begin marker is received
+        self.deadline = None  # time when sent command fails
+        self.callbacks = []
+
+    def __repr__(self):
+        return '<PipelinedCommand({0!r}, done={1})>'.format(
+            self.command, self.done)
+
+    @property
+    def done(self):
+        return self.output is not None or self.error is not None
+
+    def bracketed(self):
+        "Returns command with echo markers"
+        if isinstance(self.command, six.binary_type):
+            return six.b('echo ') + self.begin + six.b('\n') + \
+                self.command + six.b('\necho ') + self.end
+
+        return six.u('echo {0}\n{1}\necho {2}').format(
+            self.begin.decode('ascii'), self.command,
+            self.end.decode('ascii'))
+
+    def add_done_callback(self, callback):
+        """Callback is called with this object when output is received or
+        command fails"""
+        if self.done:
+            callback(self)
+        else:
+            self.callbacks.append(callback)
+
+    def result(self, timeout=1):
+        """Returns bytes output, reads responses until it is received
+
+        Raises: socket.timeout if output is not received in timeout,
+        socket.error if command failed
+        """
+        if not self.done:
+            self.pipeline.wait(timeout, self)
+
+        if not self.done:
+            raise socket.timeout("Read timeout")
+
+        if self.error is not None:
+            raise self.error
+
+        return self.output
+
+    def set_output(self, output):
+        self.output = output
+        self.run_callbacks()
+
+    def set_error(self, error):
+        self.error = error
+        self.run_callbacks()
+
+    def run_callbacks(self):
+        self.data = None
+        for callback in self.callbacks:
+            callback(self)
+
+        self.callbacks = []
+
+
+class RconPipeline(object):
+    """Sends commands without waiting for output of previous ones
+
+    Pipeline owns reading from session, so it should not be used for
+    other commands until submitted ones are done. With challenge based
+    rcon every command waits only for its challenge, not for output of
+    previous commands. Darkplaces keeps one challenge per client address,
+    so next challenge is requested only after previous one is used.
+    """
+
+    def __init__(self, rcon, max_in_flight=32, command_timeout=5):
+        """ rcon --- connected XRcon
+        max_in_flight --- maximum number of sent commands without output,
+        others are queued
+        command_timeout --- seconds after which sent command without output
+        fails with socket.timeout
+        """
+        self.rcon = rcon
+        self.max_in_flight = max_in_flight
+        self.command_timeout = command_timeout
+        self.queued = collections.deque()
+        self.challenge_wait = collections.deque()
+        self.in_flight = {}  # begin marker -> command
+        self.current = None
+        self.tail = bytearray()
+        self.challenge_time = None  # when last challenge request was sent
+        self.challenge_rto = None
+        self.challenge_retransmitted = False
+
+    def __len__(self):
+        "Number of commands without output"
+        return len(self.queued) + len(self.challenge_wait) + \
+            len(self.in_flight)
+
+    def submit(self, command, callback=None):
+        """Send command or queue it, if too many commands are in flight
+
+        Returns: PipelinedCommand
+        """
+        pending = PipelinedCommand(self, command)
+        if callback is not None:
+            pending.add_done_callback(callback)
+
+        self.queued.append(pending)
+        self.send_queued()
+        return pending
+
+    def send_queued(self):
+        while self.queued and len(self.in_flight) + \
+                len(self.challenge_wait) < self.max_in_flight:
+            if self.rcon.secure_rcon == XRcon.RCON_SECURE_CHALLENGE:
+                if self.challenge_wait:
+                    # one challenge request at a time
+                    break
+
+                pending = self.queued.popleft()
+                self.rcon.throttle()
+                pool = self.rcon.challenge_pool
+                challenge = pool.get() if pool is not None else None
+                self.challenge_wait.append(pending)
+                if challenge is None:
+                    self.request_challenge()
+                else:
+                    self.send_signed(challenge)
+            else:
+                pending = self.queued.popleft()
+                self.add_in_flight(pending)
+                self.rcon.send(pending.bracketed())
+
+    def add_in_flight(self, pending):
+        pending.deadline = monotonic_time() + self.command_timeout
+        self.in_flight[pending.begin] = pending
+
+    def fail(self, pending, error):
+        "Forget sent command, it is finished with error"
+        del self.in_flight[pending.begin]
+        if self.current is pending:
+            self.current = None
+
+        pending.set_error(error)
+
+    def request_challenge(self, retransmit=False):
+        "Send challenge request, it is resent by wait after timeout"
+        self.challenge_rto = self.rcon.rtt.backoff() if retransmit else \
+            self.rcon.rtt.rto
+        self.challenge_retransmitted = retransmit
+        self.challenge_time = monotonic_time()
+        self.rcon.sock.send(CHALLENGE_PACKET)
+
+    def send_signed(self, challenge):
+        pending = self.challenge_wait.popleft()
+        self.add_in_flight(pending)
+        self.rcon.sock.send(self.rcon.signer.challenge_packet(
+            challenge, pending.bracketed()))
+
+    def dispatch(self, packet):
+        "Process received packet"
+        if packet_startswith(packet, RCON_RESPONSE_HEADER):
+            self.tail += parse_rcon_response(packet)
+            lines = self.tail.split(six.b('\n'))
+            self.tail = lines.pop()
+            for line in lines:
+                self.dispatch_line(bytes(line))
+        elif packet_startswith(packet, CHALLENGE_RESPONSE_HEADER) and \
+                self.challenge_wait:
+            # Karn's algorithm, response to retransmitted request could be
+            # response to any transmission
+            if not self.challenge_retransmitted:
+                self.rcon.rtt.update(monotonic_time() - self.challenge_time)
+
+            self.send_signed(bytes(parse_challenge_response(packet)))
+            self.send_queued()
+
+    def dispatch_line(self, line):
+        current = self.current
+        # output without trailing newline is joined with end marker
+        if current is not None and line.endswith(current.end):
+            current.data += line[:-len(current.end)]
+            del self.in_flight[current.begin]
+            self.current = None
+            current.set_output(bytes(current.data))
+            self.send_queued()
+            return
+
+        pending = self.in_flight.get(line)
+        if pending is not None:
+            if current is not None:
+                self.fail(current, socket.error("End marker is lost"))
+
+            self.current = pending
+            pending.data = bytearray()
+            self.send_queued()
+        elif current is not None:
+            current.data += line + six.b('\n')
+        # output outside of markers is ignored
+
+    def expire(self):
+        "Fail sent commands without output after command_timeout"
+        now = monotonic_time()
+        for pending in list(self.in_flight.values()):
+            if pending.deadline <= now:
+                self.fail(pending, socket.timeout("Command timeout"))
+
+        self.send_queued()
+
+    def wait(self, timeout=1, command=None):
+        """Read responses until all commands or given command are done
+
+        Returns: True if there are no commands without output
+        """
+        def finished():
+            return command.done if command is not None else not len(self)
+
+        deadline = monotonic_time() + timeout
+        while True:
+            self.expire()
+            if finished():
+                break
+
+            now = monotonic_time()
+            if deadline <= now:
+                break
+
+            window_end = min([deadline] + [
+                pending.deadline for pending in self.in_flight.values()])
+            if self.challenge_wait:
+                # challenge request or its response could be lost
+                resend_time = self.challenge_time + self.challenge_rto
+                if resend_time <= now:
+                    self.request_challenge(retransmit=True)
+                    continue
+
+                window_end = min(window_end, resend_time)
+
+            if window_end <= now:
+                # command deadline, it is expired on next iteration
+                continue
+
+            try:
+                # challenges are not collected to pool
+                for packet in QuakeProtocol.read_view_iterator(
+                        self.rcon, window_end - now):
+                    self.dispatch(packet)
+                    if finished():
+                        break
+            except socket.timeout:
+                pass
+
+        return not len(self)
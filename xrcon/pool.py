@@ -0,0 +1,170 @@
+"""Pool of connected rcon sessions
+
+Example:
+
+    pool = XRconPool()
+    with pool.session('server', 26000, 'password') as rcon:
+        data = rcon.execute('status')
+"""
+import collections
+import socket
+import threading
+from contextlib import contextmanager
+from .client import XRcon
+from .utils import monotonic_time
+
+
+class XRconPool(object):
+    """Thread-safe pool of connected XRcon sessions keyed by
+    (host, port, password, secure_rcon)
+
+    Reused session skips address resolution and socket creation, session
+    which was idle for too long is checked with ping2 before reuse.
+    """
+
+    rcon_class = XRcon
+
+    def __init__(self, max_idle=4, idle_timeout=60, check_after=10,
+                 ping_timeout=0.5, timeout=0.7):
+        """ max_idle --- maximum number of idle sessions per key
+        idle_timeout --- idle sessions older than this are closed
+        check_after --- session idle for more seconds is pinged before reuse,
+        None disables health checks
+        ping_timeout --- health check timeout
+        timeout --- socket timeout of created sessions
+        """
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.check_after = check_after
+        self.ping_timeout = ping_timeout
+        self.timeout = timeout
+        self.idle = collections.defaultdict(collections.deque)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def session_key(rcon):
+        return rcon.host, rcon.port, rcon.password, rcon.secure_rcon
+
+    def __len__(self):
+        "Number of idle sessions"
+        with self.lock:
+            return sum(len(sessions) for sessions in self.idle.values())
+
+    def acquire(self, host, port, password,
+                secure_rcon=XRcon.RCON_SECURE_TIME):
+        "Returns connected session, caller owns it until release"
+        key = (host, port, password, secure_rcon)
+        while True:
+            with self.lock:
+                sessions = self.idle.get(key)
+                if not sessions:
+                    break
+                # most recently used session is most likely alive
+                rcon, last_used = sessions.pop()
+
+            idle_time = monotonic_time() - last_used
+            if idle_time > self.idle_timeout or not self.is_healthy(
+                    rcon, idle_time):
+                self.close_session(rcon)
+                continue
+
+            return rcon
+
+        rcon = self.rcon_class(host, port, password, secure_rcon,
+                               self.timeout)
+        rcon.connect()
+        return rcon
+
+    def is_healthy(self, rcon, idle_time):
+        if self.check_after is None or idle_time <= self.check_after:
+            return True
+
+        try:
+            return rcon.ping2(self.ping_timeout) is not None
+        except socket.error:
+            return False
+
+    def release(self, rcon, discard=False):
+        """Return session to pool
+
+        Args:
+            rcon --- session returned by acquire
+            discard --- close session instead of reuse, for example after
+            network errors
+
+        Session with unread packets is closed too.
+        """
+        # late response would be read as output of next command
+        if discard or rcon.sock is None or self.has_pending(rcon):
+            self.close_session(rcon)
+            return
+
+        excess = None
+        with self.lock:
+            sessions = self.idle[self.session_key(rcon)]
+            sessions.append((rcon, monotonic_time()))
+            if len(sessions) > self.max_idle:
+                excess, _ = sessions.popleft()
+
+        if excess is not None:
+            self.close_session(excess)
+
+    @contextmanager
+    def session(self, host, port, password,
+                secure_rcon=XRcon.RCON_SECURE_TIME):
+        "Context manager which acquires and releases session"
+        rcon = self.acquire(host, port, password, secure_rcon)
+        discard = False
+        try:
+            yield rcon
+        except socket.error:
+            discard = True
+            raise
+        finally:
+            self.release(rcon, discard)
+
+    def evict_idle(self):
+        "Close sessions idle longer than idle_timeout"
+        expired = []
+        deadline = monotonic_time() - self.idle_timeout
+        with self.lock:
+            for key in list(self.idle.keys()):
+                sessions = self.idle[key]
+                while sessions and sessions[0][1] < deadline:
+                    expired.append(sessions.popleft()[0])
+
+                if not sessions:
+                    del self.idle[key]
+
+        for rcon in expired:
+            self.close_session(rcon)
+
+        return len(expired)
+
+    def close(self):
+        "Close all idle sessions"
+        with self.lock:
+            sessions = [rcon for key_sessions in self.idle.values()
+                        for rcon, _ in key_sessions]
+            self.idle.clear()
+
+        for rcon in sessions:
+            self.close_session(rcon)
+
+    @staticmethod
+    def has_pending(rcon):
+        "Checks without blocking if session has received packets"
+        rcon.sock.settimeout(0)
+        try:
+            rcon.sock.recv(1)
+        except socket.error:
+            return False
+        finally:
+            rcon.sock.settimeout(rcon.timeout)
+
+        return True
+
+    @staticmethod
+    def close_session(rcon):
+        if rcon.sock is not None:
+            rcon.close()
@@ -0,0 +1,105 @@
+"""Query many servers in parallel with thread pool
+
+Example:
+
+    for res in query_many(['server1:26000', 'server2'], 'getstatus'):
+        if res.error is None:
+            server_vars, players = res.result
+"""
+import socket
+from collections import namedtuple
+from concurrent import futures
+from .client import QuakeProtocol, XRcon
+from .utils import monotonic_time
+
+
+QueryResult = namedtuple('QueryResult',
+                         ['server', 'op', 'result', 'latency', 'error'])
+QueryResult.__doc__ = """Result of one query
+
+server --- server string
+op --- name of operation
+result --- returned value of operation, None if error is set
+latency --- time of operation in seconds, None if it is not finished
+error --- exception or None
+"""
+
+OPERATIONS = frozenset(['getstatus', 'getinfo', 'ping2', 'ping3', 'execute'])
+TIMED_OPERATIONS = frozenset(['ping2', 'ping3', 'execute'])
+
+
+def query_server(server, op, password=None, command=None,
+                 secure_rcon=XRcon.RCON_SECURE_TIME, timeout=0.7,
+                 op_timeout=None):
+    "Run one operation, exceptions are returned in result"
+    start = monotonic_time()
+    try:
+        if op == 'execute':
+            qp = XRcon.create_by_server_str(server, password, secure_rcon,
+                                            timeout)
+        else:
+            qp = QuakeProtocol.create_by_server_str(server, timeout)
+
+        qp.connect()
+        try:
+            # only pings and execute accept timeout of operation
+            args = (command,) if op == 'execute' else ()
+            if op_timeout is not None and op in TIMED_OPERATIONS:
+                args += (op_timeout,)
+
+            result = getattr(qp, op)(*args)
+        finally:
+            qp.close()
+    except (socket.error, ValueError) as e:
+        return QueryResult(server, op, None, monotonic_time() - start, e)
+
+    return QueryResult(server, op, result, monotonic_time() - start, None)
+
+
+def query_many(servers, op='getstatus', workers=32, deadline=None,
+               password=None, command=None,
+               secure_rcon=XRcon.RCON_SECURE_TIME, timeout=0.7,
+               op_timeout=None):
+    """Run operation on many servers with thread pool
+
+    Args:
+        servers --- iterable of server strings like "host:port"
+        op --- one of getstatus, getinfo, ping2, ping3, execute
+        workers --- maximum number of threads
+        deadline --- seconds for all queries, unfinished queries are
+        returned with socket.timeout error, None means no deadline
+        password, command, secure_rcon --- used by execute
+        timeout --- socket timeout
+        op_timeout --- timeout passed to operation (ping or execute),
+        ignored by getstatus and getinfo
+
+    Yields: QueryResult in order of completion
+    """
+    if op not in OPERATIONS:
+        raise ValueError("Unknown operation {0!r}".format(op))
+
+    if op == 'execute' and (password is None or command is None):
+        raise ValueError("execute requires password and command")
+
+    servers = list(servers)
+    if not servers:
+        return
+
+    executor = futures.ThreadPoolExecutor(max(min(workers, len(servers)), 1))
+    try:
+        pending = dict(
+            (executor.submit(query_server, server, op, password, command,
+                             secure_rcon, timeout, op_timeout), server)
+            for server in servers)
+        try:
+            for future in futures.as_completed(pending, deadline):
+                del pending[future]
+                yield future.result()
+        except futures.TimeoutError:
+            for future, server in pending.items():
+                future.cancel()
+                yield QueryResult(server, op, None, None,
+                                  socket.timeout("Deadline exceeded"))
+    finally:
+        # running queries are finished by their own timeouts
+        executor.shutdown(wait=False)
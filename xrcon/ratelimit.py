@@ -0,0 +1,144 @@
+"""Rate limiting of rcon commands
+
+Darkplaces drops commands which come too fast, so bulk operations should
+be throttled. Senders are blocked (or suspended in asyncio client) until
+command could be sent.
+
+Example:
+
+    XRcon.rate_limiter = RateLimiter(rate=5, burst=10, global_rate=200)
+    # all XRcon sessions would wait before send if limit is exceeded
+"""
+import threading
+import time
+from .utils import monotonic_time
+
+
+class TokenBucket(object):
+    """Token bucket with rate tokens per second and capacity of burst
+    tokens
+
+    It is implemented as virtual scheduling (GCRA), so it keeps only time
+    when bucket would be full again, and tokens could be reserved in
+    future.
+    """
+
+    def __init__(self, rate, burst=1):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate should be positive and burst at least 1")
+
+        self.rate = rate
+        self.burst = burst
+        self.interval = 1.0 / rate
+        self.full_time = 0  # theoretical arrival time of next token
+
+    def earliest(self, now):
+        "Earliest time when token is available"
+        return max(now, self.full_time - (self.burst - 1) * self.interval)
+
+    def consume(self, at):
+        "Take token at given time, it should not be before earliest time"
+        self.full_time = max(self.full_time, at) + self.interval
+
+    def reserve(self, now=None):
+        "Take token, returns time to wait before it could be used"
+        if now is None:
+            now = monotonic_time()
+
+        at = self.earliest(now)
+        self.consume(at)
+        return at - now
+
+    def is_full(self, now):
+        return self.full_time <= now
+
+
+class RateLimiter(object):
+    """Thread-safe limiter with token bucket per server and optional global
+    bucket shared by all servers
+
+    Sender reserves token of server bucket first, and only when it is time
+    to send takes token of global bucket, so commands waiting for slow
+    server do not hold global tokens needed by other servers.
+    """
+
+    def __init__(self, rate=10, burst=5, global_rate=None, global_burst=None):
+        """ rate --- commands per second for every server
+        burst --- number of commands which could be sent at once
+        global_rate --- commands per second for all servers, None disables
+        global limit
+        global_burst --- burst of global bucket, same as burst by default
+        """
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.global_bucket = None
+        if global_rate is not None:
+            self.global_bucket = TokenBucket(
+                global_rate, burst if global_burst is None else global_burst)
+
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.buckets)
+
+    def set_limit(self, key, rate, burst=1):
+        "Use custom limit for server with key (host, port)"
+        with self.lock:
+            self.buckets[key] = TokenBucket(rate, burst)
+
+    def reserve(self, key):
+        """Reserve slot for command to server with key (host, port)
+
+        Returns: seconds which caller should wait before reserve_global
+        """
+        now = monotonic_time()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(self.rate,
+                                                         self.burst)
+
+            return bucket.reserve(now)
+
+    def reserve_global(self, key):
+        """Take token of global bucket, should be called after reserve
+
+        Returns: seconds which caller should wait before sending
+        """
+        if self.global_bucket is None:
+            return 0
+
+        now = monotonic_time()
+        with self.lock:
+            delay = self.global_bucket.reserve(now)
+            bucket = self.buckets.get(key)
+            if delay > 0 and bucket is not None:
+                # command is sent later than server slot, so next slots of
+                # this server are moved too
+                bucket.full_time += delay
+
+        return delay
+
+    def acquire(self, key):
+        "Block until command could be sent, returns waited time"
+        waited = 0
+        for reserve in (self.reserve, self.reserve_global):
+            delay = reserve(key)
+            if delay > 0:
+                time.sleep(delay)
+                waited += delay
+
+        return waited
+
+    def evict_idle(self):
+        "Remove full buckets with default limit, returns number of removed"
+        now = monotonic_time()
+        with self.lock:
+            idle = [key for key, bucket in self.buckets.items()
+                    if bucket.is_full(now) and bucket.rate == self.rate and
+                    bucket.burst == self.burst]
+            for key in idle:
+                del self.buckets[key]
+
+        return len(idle)
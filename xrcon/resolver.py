@@ -0,0 +1,131 @@
+"""Caching wrapper around socket.getaddrinfo
+
+Example:
+
+    resolver = Resolver(ttl=300)
+    resolver.resolve_many([('server1', 26000), ('server2', 26000)])
+    QuakeProtocol.resolver = resolver  # all clients would use cache
+"""
+import socket
+import threading
+from six.moves import queue
+from .utils import monotonic_time
+
+
+class Resolver(object):
+    """Thread-safe getaddrinfo cache with TTL
+
+    Failed lookups are cached too (negative caching) for negative_ttl
+    seconds, cached error is raised again for every lookup.
+
+    Records are keyed by (host, port, family, type, flags), proto is not
+    part of key because it is implied by socket type, so lookups with
+    proto 0 and IPPROTO_UDP share record.
+    """
+
+    def __init__(self, ttl=300, negative_ttl=30):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.cache)
+
+    def get_cached(self, host, port, family=0, type=0, proto=0, flags=0):
+        """Returns cached getaddrinfo result or None if there is no fresh
+        record, cached error is raised"""
+        key = (host, port, family, type, flags)
+        with self.lock:
+            record = self.cache.get(key)
+            if record is None:
+                return None
+
+            expire_time, result, error = record
+            if expire_time <= monotonic_time():
+                del self.cache[key]
+                return None
+
+        if error is not None:
+            raise error
+
+        return result
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        "Same as socket.getaddrinfo but results are cached"
+        result = self.get_cached(host, port, family, type, proto, flags)
+        if result is not None:
+            return result
+
+        key = (host, port, family, type, flags)
+        try:
+            result = socket.getaddrinfo(host, port, family, type, proto,
+                                        flags)
+        except socket.gaierror as e:
+            self.store(key, None, e, self.negative_ttl)
+            raise
+
+        self.store(key, result, None, self.ttl)
+        return result
+
+    def store(self, key, result, error, ttl):
+        with self.lock:
+            self.cache[key] = (monotonic_time() + ttl, result, error)
+
+    def resolve_many(self, addrs, family=0, type=socket.SOCK_DGRAM, proto=0,
+                     flags=0, workers=16):
+        """Resolve many addresses in parallel and put them to cache
+
+        Args:
+            addrs --- iterable of (host, port) tuples
+            family, type, flags --- same as in later lookups, otherwise
+            they miss cache
+            workers --- number of resolving threads
+
+        Returns: dict where key is (host, port) and value is getaddrinfo
+        result or exception
+        """
+        tasks = queue.Queue()
+        for addr in set(addrs):
+            tasks.put(addr)
+
+        results = {}
+
+        def worker():
+            while True:
+                try:
+                    host, port = tasks.get_nowait()
+                except queue.Empty:
+                    return
+
+                try:
+                    results[(host, port)] = self.getaddrinfo(
+                        host, port, family, type, proto, flags)
+                except (socket.error, UnicodeError) as e:
+                    results[(host, port)] = e
+
+        threads = [threading.Thread(target=worker)
+                   for i in range(min(workers, tasks.qsize()))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def evict_expired(self):
+        "Remove stale records, returns number of removed records"
+        now = monotonic_time()
+        with self.lock:
+            expired = [key for key, record in self.cache.items()
+                       if record[0] <= now]
+            for key in expired:
+                del self.cache[key]
+
+        return len(expired)
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
@@ -1,10 +1,15 @@
+import array
 import time
 import socket
 import struct
 import hashlib
 import hmac
+import binascii
+import codecs
+import os
 import re
 import six
+from . import md4 as _md4
 
 
 MAX_PACKET_SIZE = 1400
@@ -13,6 +18,14 @@ RCON_RESPONSE_HEADER = QUAKE_PACKET_HEADER + six.b('n')
 CHALLENGE_PACKET = QUAKE_PACKET_HEADER + six.b('getchallenge')
 CHALLENGE_RESPONSE_HEADER = QUAKE_PACKET_HEADER + six.b('challenge ')
 MASTER_RESPONSE_HEADER = QUAKE_PACKET_HEADER + six.b('getserversResponse')
+MASTER_EXT_RESPONSE_HEADER = QUAKE_PACKET_HEADER + \
+    six.b('getserversExtResponse')
+MASTER_EOT = six.b('\\EOT\x00\x00\x00')
+MASTER_EOF = six.b('\\EOF\x00\x00\x00')
+MASTER_IPV4_ENTRY = struct.Struct('>x4sH')
+MASTER_IPV4_PACKED_ENTRY = struct.Struct('>xIH')
+MASTER_IPV6_ENTRY = struct.Struct('>x16sH')
+MASTER_IPV6_PACKED_ENTRY = struct.Struct('>xQQH')
 PING_Q2_PACKET = QUAKE_PACKET_HEADER + six.b('ping')
 PONG_Q2_PACKET = QUAKE_PACKET_HEADER + six.b('ack')
 PING_Q3_PACKET = six.b('ping')
@@ -21,6 +34,8 @@ PING_QFUSION_PACKET = PING_Q2_PACKET
 PONG_QFUSION_PACKET = QUAKE_PACKET_HEADER + six.b('ack ')
 QUAKE_STATUS_PACKET = QUAKE_PACKET_HEADER + six.b('getstatus')
 STATUS_RESPONSE_HEADER = QUAKE_PACKET_HEADER + six.b('statusResponse\n')
+QUAKE_INFO_PACKET = QUAKE_PACKET_HEADER + six.b('getinfo')
+INFO_RESPONSE_HEADER = QUAKE_PACKET_HEADER + six.b('infoResponse\n')
 ADDR_STR_RE = re.compile(r"""
     ^(?:
         (?P<host>[^:]+)               # ipv4 address or host name
@@ -30,10 +45,39 @@ ADDR_STR_RE = re.compile(r"""
     """, re.VERBOSE)
 
 
-def md4(*args, **kwargs):
+if six.PY3:  # pragma: no cover
+    monotonic_time = time.monotonic
+else:   # pragma: no cover
+    monotonic_time = time.time
+
+
+# python 3.3 does not have Struct.iter_unpack
+if hasattr(struct.Struct, 'iter_unpack'):  # pragma: no cover
+    def iter_unpack(struct_obj, data):
+        return struct_obj.iter_unpack(data)
+else:   # pragma: no cover
+    def iter_unpack(struct_obj, data):
+        return (struct_obj.unpack_from(data, offset)
+                for offset in range(0, len(data), struct_obj.size))
+
+
+def openssl_md4(*args, **kwargs):
     return hashlib.new('MD4', *args, **kwargs)
 
 
+def has_openssl_md4():
+    try:
+        openssl_md4()
+    except ValueError:
+        return False
+
+    return True
+
+
+# OpenSSL 3.0 disables MD4 by default, built-in implementation is used then
+md4 = openssl_md4 if has_openssl_md4() else _md4.new
+
+
 def rcon_nosecure_packet(password, command):
     return QUAKE_PACKET_HEADER + six.b(
         'rcon {password} {command}'.format(password=password, command=command))
@@ -57,49 +101,211 @@ else:  # pragma: no cover
         return hmac.new(key, msg, md4)
 
 
+class RconSigner(object):
+    """Builds signed secure rcon packets for one password
+
+    HMAC state is keyed by password only once, for every message its copy
+    is used, so inner and outer pads are not computed again.
+    """
+
+    TIME_PREFIX = QUAKE_PACKET_HEADER + six.b('srcon HMAC-MD4 TIME ')
+    CHALLENGE_PREFIX = QUAKE_PACKET_HEADER + \
+        six.b('srcon HMAC-MD4 CHALLENGE ')
+
+    def __init__(self, password):
+        self.password = to_bytes(password)
+        self.hmac = hmac.new(self.password, digestmod=md4)
+
+    def sign(self, msg):
+        "Returns HMAC-MD4 digest of msg"
+        mac = self.hmac.copy()
+        mac.update(msg)
+        return mac.digest()
+
+    def sign_many(self, messages):
+        "Returns list of HMAC-MD4 digests, one for every message"
+        if md4 is _md4.new:
+            return _md4.hmac_many(self.password, messages)
+
+        copy = self.hmac.copy
+        digests = []
+        for msg in messages:
+            mac = copy()
+            mac.update(msg)
+            digests.append(mac.digest())
+
+        return digests
+
+    @staticmethod
+    def time_message(command, cur_time):
+        if six.PY3 and isinstance(command, six.binary_type):
+            command = command.decode("utf8")
+
+        return six.b("{time:6f} {cmd}".format(time=cur_time, cmd=command))
+
+    def time_packet(self, command, time_diff=0):
+        cmd_and_time = self.time_message(command, time.time() + time_diff)
+        return six.b('').join([
+            self.TIME_PREFIX,
+            self.sign(cmd_and_time),
+            six.b(' '),
+            cmd_and_time
+        ])
+
+    def time_packets(self, commands, time_diff=0):
+        """Sign many commands at once, all packets share same timestamp
+
+        Returns: list of packets in order of commands
+        """
+        cur_time = time.time() + time_diff
+        messages = [self.time_message(command, cur_time)
+                    for command in commands]
+        prefix, space = self.TIME_PREFIX, six.b(' ')
+        return [six.b('').join([prefix, digest, space, msg])
+                for digest, msg in zip(self.sign_many(messages), messages)]
+
+    def challenge_packet(self, challenge, command):
+        challenge = to_bytes(challenge)
+        command = to_bytes(command)
+        msg = six.b(' ').join([challenge, command])
+        return six.b('').join([
+            self.CHALLENGE_PREFIX,
+            self.sign(msg),
+            six.b(' '),
+            msg
+        ])
+
+
 def rcon_secure_time_packet(password, command, time_diff=0):
-    if six.PY3 and isinstance(command, six.binary_type):
-        command = command.decode("utf8")
+    return RconSigner(password).time_packet(command, time_diff)
+
 
-    cur_time = time.time() + time_diff
-    cmd_and_time = "{time:6f} {cmd}".format(time=cur_time, cmd=command)
-    key = hmac_md4(password, cmd_and_time).digest()
-    return six.b('').join([
-        QUAKE_PACKET_HEADER,
-        six.b('srcon HMAC-MD4 TIME '),
-        key,
-        six.b(' '),
-        six.b(cmd_and_time)
-    ])
+def packet_startswith(packet, header):
+    "Same as bytes.startswith, but also works with memoryview"
+    return packet[:len(header)] == header
 
 
 def parse_challenge_response(response):
+    "Works with bytes and memoryview, slice of same type is returned"
     l = len(CHALLENGE_RESPONSE_HEADER)
     return response[l:l+11]
 
 
 def rcon_secure_challenge_packet(password, challenge, command):
-    password = to_bytes(password)
-    challenge = to_bytes(challenge)
-    command = to_bytes(command)
-    hmac_key = six.b(' ').join([challenge, command])
-    key = hmac_md4(password, hmac_key).digest()
-    return six.b('').join([
-        QUAKE_PACKET_HEADER,
-        six.b('srcon HMAC-MD4 CHALLENGE '),
-        key,
-        six.b(' '),
-        challenge,
-        six.b(' '),
-        command
-    ])
+    return RconSigner(password).challenge_packet(challenge, command)
 
 
 def parse_rcon_response(packet):
+    "Works with bytes and memoryview, slice of same type is returned"
     l = len(RCON_RESPONSE_HEADER)
     return packet[l:]
 
 
+def make_sentinel():
+    "Returns random bytes token which marks end of rcon response"
+    return six.b('xrcon_') + binascii.hexlify(os.urandom(8))
+
+
+def append_sentinel(command, sentinel):
+    """Append echo of sentinel to command
+
+    Newline is used as separator instead of ';' because darkplaces splits
+    commands by newline even inside quotes.
+    """
+    if isinstance(command, six.binary_type):
+        return command + six.b('\necho ') + sentinel
+
+    return command + six.u('\necho ') + sentinel.decode('ascii')
+
+
+def strip_sentinel(output, sentinel):
+    """Remove echoed sentinel line from the end of response
+
+    Returns: tuple (output, found)
+    """
+    line = sentinel + six.b('\n')
+    if output.endswith(line):
+        return output[:-len(line)], True
+
+    return output, False
+
+
+def command_separator(command):
+    """Returns separator which could follow command in joined command line
+
+    ';' is used when possible, but it does not split commands inside quotes
+    and comments, so newline is used after commands with unclosed quote or
+    '//' comment.
+    """
+    if isinstance(command, six.binary_type):
+        # quotes and slashes are ascii, so any single byte encoding works
+        command = command.decode('latin1')
+
+    quoted = False
+    for i, char in enumerate(command):
+        if char == '"' and (i == 0 or command[i - 1] != '\\'):
+            quoted = not quoted
+        elif not quoted and command.startswith('//', i):
+            return '\n'
+
+    return '\n' if quoted else ';'
+
+
+def pack_commands(commands, max_size):
+    """Join commands to as few command lines as possible
+
+    Args:
+        commands --- iterable of commands, bytes or text
+        max_size --- maximum size of command line in bytes
+
+    Returns: list of command lines of same type as commands
+    """
+    lines = []
+    parts = []
+    size = 0  # size of parts including trailing separator
+    for command in commands:
+        binary = isinstance(command, six.binary_type)
+        length = len(command if binary else command.encode('utf8'))
+        if length > max_size:
+            raise ValueError('Command is too long: {0!r}'.format(command))
+
+        if parts and size + length > max_size:
+            lines.append(parts[0][:0].join(parts[:-1]))
+            parts, size = [], 0
+
+        separator = command_separator(command)
+        parts.extend([command, separator.encode('ascii')
+                      if binary else six.u(separator)])
+        size += length + 1
+
+    if parts:
+        lines.append(parts[0][:0].join(parts[:-1]))
+
+    return lines
+
+
+class LineDecoder(object):
+    """Incrementally decodes chunks of bytes to text lines, multibyte
+    characters splitted between chunks are decoded correctly"""
+
+    def __init__(self, encoding='utf8', errors='replace'):
+        self.decoder = codecs.getincrementaldecoder(encoding)(errors)
+        self.pending = six.u('')
+
+    def feed(self, data):
+        "Returns list of completed lines, each line ends with newline"
+        text = self.pending + self.decoder.decode(data)
+        lines = text.split(six.u('\n'))
+        self.pending = lines.pop()
+        return [line + six.u('\n') for line in lines]
+
+    def flush(self):
+        "Returns rest of text without trailing newline"
+        text = self.pending + self.decoder.decode(six.b(''), True)
+        self.pending = six.u('')
+        return text
+
+
 def parse_server_addr(str_addr, default_port=26000):
     """Parse address and returns host and port
 
@@ -146,15 +352,17 @@ def parse_server_vars(server_vars):
     if not server_vars.startswith(six.b('\\')):
         raise ValueError('Invalid server vars')
 
-    values = server_vars.split(six.b('\\'))[1:]
-    return dict(zip(values[::2], values[1::2]))
+    values = iter(server_vars.split(six.b('\\')))
+    next(values)  # empty string before first backslash
+    return dict(zip(values, values))
 
 
 class Player(object):
 
     PLAYER_RE = re.compile(
-        six.b('^(?P<frags>-?\d+) (?P<ping>-?\d+) "(?P<name>.*?)"$')
+        six.b('^(?P<frags>-?\\d+) (?P<ping>-?\\d+) "(?P<name>.*?)"$')
     )
+    "kept for compatibility, parse_player does not use it"
     __slots__ = ('frags', 'ping', 'name')
 
     def __init__(self, frags, ping, name):
@@ -172,40 +380,427 @@ class Player(object):
 
     @classmethod
     def parse_player(cls, player_data):
-        m = cls.PLAYER_RE.match(player_data)
-        if m is None:
-            raise ValueError('Bad player data')
+        """Parse player line like '57 72 "name"', accepts same lines as
+        PLAYER_RE but does not use regex"""
+        if player_data.endswith(six.b('\n')):
+            player_data = player_data[:-1]
+
+        return cls(*parse_player_fields(player_data))
+
+    @classmethod
+    def parse_players(cls, lines):
+        "Parse many player lines, returns list of players"
+        return [cls(frags, ping, name)
+                for frags, ping, name in iter_player_fields(lines)]
+
+
+def parse_player_fields(line, space=six.b(' '), quote=six.b('"'),
+                        newline=six.b('\n'), minus=six.b('-')):
+    """Returns tuple (frags, ping, name) of player line, line is validated
+    same way as Player.PLAYER_RE does, but without regex"""
+    fields = line.split(space, 2)
+    if len(fields) == 3:
+        frags, ping, name = fields
+        # isdigit rejects signs, spaces and underscores which int accepts
+        if name[:1] == quote and name[-1:] == quote and len(name) > 1 and \
+                newline not in name and frags.lstrip(minus).isdigit() and \
+                ping.lstrip(minus).isdigit():
+            return int(frags), int(ping), name[1:-1]
+
+    raise ValueError('Bad player data')
+
+
+def iter_player_fields(lines):
+    "Yields tuple (frags, ping, name) for every player line"
+    for line in lines:
+        yield parse_player_fields(line)
+
+
+class PlayerTable(object):
+    """Columnar storage of players
+
+    Frags and pings are kept in arrays of C ints, names are stored in one
+    bytearray, name of player i is names[offsets[i]:offsets[i + 1]].
+    Tables of many servers could be joined with extend, so large snapshots
+    do not create object per player.
+    """
+
+    __slots__ = ('frags', 'pings', 'names', 'offsets')
+
+    def __init__(self):
+        self.frags = array.array('i')
+        self.pings = array.array('i')
+        self.names = bytearray()
+        self.offsets = array.array('i', [0])
+
+    def __len__(self):
+        return len(self.frags)
+
+    def __repr__(self):
+        return six.u('<PlayerTable({0} players)>').format(len(self))
+
+    @classmethod
+    def from_lines(cls, lines):
+        "Parse player lines of status response"
+        table = cls()
+        table.extend_fields(iter_player_fields(lines))
+        return table
+
+    def append(self, frags, ping, name):
+        self.frags.append(frags)
+        self.pings.append(ping)
+        self.names += name
+        self.offsets.append(len(self.names))
+
+    def extend_fields(self, fields):
+        "Append players from iterable of (frags, ping, name) tuples"
+        for frags, ping, name in fields:
+            self.append(frags, ping, name)
+
+    def extend(self, other):
+        "Append all players of other table"
+        shift = len(self.names)
+        self.frags.extend(other.frags)
+        self.pings.extend(other.pings)
+        self.names += other.names
+        self.offsets.extend(offset + shift for offset in other.offsets[1:])
+
+    def name(self, index):
+        return bytes(self.names[self.offsets[index]:self.offsets[index + 1]])
+
+    def __getitem__(self, index):
+        "Returns Player object, negative indexes are supported"
+        if index < 0:
+            index += len(self)
+
+        if not 0 <= index < len(self):
+            raise IndexError('player index out of range')
 
-        return cls.from_dict(m.groupdict())
+        return Player(self.frags[index], self.pings[index], self.name(index))
 
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
 
-def parse_status_packet(status_packet, player_factory=Player.parse_player):
-    data = status_packet[len(STATUS_RESPONSE_HEADER):]
-    parts = data.split(six.b('\n'))[:-1]  # split server vars and player
-    # sections and remove last '\n' symbol
-    if len(parts) < 1:
+    def to_numpy(self):
+        """Returns dict of numpy arrays which share memory with table:
+        frags, pings, offsets (int32) and names (uint8)
+
+        Table could not grow while these arrays exist. Requires numpy.
+        """
+        import numpy
+        return {
+            'frags': numpy.frombuffer(self.frags, dtype=numpy.intc),
+            'pings': numpy.frombuffer(self.pings, dtype=numpy.intc),
+            'offsets': numpy.frombuffer(self.offsets, dtype=numpy.intc),
+            'names': numpy.frombuffer(self.names, dtype=numpy.uint8),
+        }
+
+
+def make_query_challenge():
+    "Returns random challenge for getinfo query"
+    return binascii.hexlify(os.urandom(6))
+
+
+def info_packet(challenge=None):
+    "getinfo request, server echoes challenge in response"
+    if challenge is None:
+        return QUAKE_INFO_PACKET
+
+    return QUAKE_INFO_PACKET + six.b(' ') + challenge
+
+
+def parse_info_packet(info_packet, challenge=None):
+    """Parse infoResponse packet
+
+    Args:
+        info_packet --- bytes or memoryview
+        challenge --- if passed then ValueError is raised when response
+        has other challenge
+
+    Returns: dict of server vars like hostname, mapname, clients,
+    sv_maxclients and gametype
+    """
+    data = bytes(info_packet[len(INFO_RESPONSE_HEADER):])
+    server_vars = parse_server_vars(data.partition(six.b('\n'))[0])
+    if challenge is not None and \
+            server_vars.get(six.b('challenge')) != challenge:
+        raise ValueError("Challenge mismatch")
+
+    return server_vars
+
+
+def is_info_response(packet, challenge):
+    "True if packet is infoResponse for getinfo with challenge"
+    if not packet_startswith(packet, INFO_RESPONSE_HEADER):
+        return False
+
+    try:
+        parse_info_packet(packet, challenge)
+    except ValueError:
+        return False
+
+    return True
+
+
+def parse_status_packet(status_packet, player_factory=Player.parse_player,
+                        players=True, columnar=False):
+    """Parse status response
+
+    Args:
+        status_packet --- bytes or memoryview
+        player_factory --- function which parses player line
+        players --- if False then player lines are not parsed
+        columnar --- if True then players are returned as PlayerTable,
+        player_factory is not used then
+
+    Returns: tuple (server vars, list of players or PlayerTable or None)
+    """
+    # memoryview is copied to bytes once, bytes are not copied here
+    data = bytes(status_packet[len(STATUS_RESPONSE_HEADER):])
+    server_vars, sep, players_data = data.partition(six.b('\n'))
+    if not sep:
         raise ValueError("Bad packet")
 
-    server_vars, players_dat = parts[0], parts[1:]
-    players = list(player_factory(playerd) for playerd in players_dat)
+    if not players:
+        return parse_server_vars(server_vars), None
+
+    # text after last newline is not complete player line
+    lines = players_data.split(six.b('\n'))
+    lines.pop()
+    if columnar:
+        players = PlayerTable.from_lines(lines)
+    elif player_factory == Player.parse_player:
+        players = Player.parse_players(lines)
+    else:
+        players = [player_factory(line) for line in lines]
+
     return parse_server_vars(server_vars), players
 
 
+class StatusResponse(object):
+    """Lazy view of status response packet
+
+    Server vars are looked up in raw packet on first access and cached,
+    players are parsed only while they are iterated. Use it when only few
+    fields of status are needed.
+    """
+
+    __slots__ = ('data', 'vars_end', 'player_factory', 'cache')
+
+    def __init__(self, status_packet, player_factory=Player.parse_player):
+        self.data = bytes(status_packet[len(STATUS_RESPONSE_HEADER):])
+        self.vars_end = self.data.find(six.b('\n'))
+        if self.vars_end < 0:
+            raise ValueError("Bad packet")
+
+        if not self.data.startswith(six.b('\\')):
+            raise ValueError('Invalid server vars')
+
+        self.player_factory = player_factory
+        self.cache = {}
+
+    def __repr__(self):
+        return six.u('<StatusResponse({0} vars, {1} players)>').format(
+            self.data.count(six.b('\\'), 0, self.vars_end) // 2,
+            self.player_count)
+
+    def find_value(self, key, backslash=six.b('\\')):
+        "Search value of key in packet, returns None if there is no key"
+        data, end = self.data, self.vars_end
+        pattern = backslash + key + backslash
+        pos = data.find(pattern, 0, end)
+        while pos >= 0:
+            # even number of preceding backslashes means key position,
+            # otherwise pattern is inside value
+            if data.count(backslash, 0, pos) % 2 == 0:
+                start = pos + len(pattern)
+                value_end = data.find(backslash, start, end)
+                return data[start:end if value_end < 0 else value_end]
+
+            pos = data.find(pattern, pos + 1, end)
+
+    def get(self, key, default=None):
+        "Value of server var, key is bytes or text"
+        cache = self.cache
+        if key in cache:
+            value = cache[key]
+        else:
+            value = cache[key] = self.find_value(
+                key if isinstance(key, six.binary_type) else to_bytes(key))
+
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    @property
+    def server_vars(self):
+        "All server vars as dict, same as parse_server_vars returns"
+        return parse_server_vars(self.data[:self.vars_end])
+
+    @property
+    def player_count(self):
+        "Number of player lines, players are not parsed"
+        return self.data.count(six.b('\n'), self.vars_end + 1)
+
+    def iter_players(self):
+        "Yields parsed players one by one"
+        data, newline = self.data, six.b('\n')
+        start = self.vars_end + 1
+        end = data.find(newline, start)
+        while end >= 0:
+            yield self.player_factory(data[start:end])
+            start = end + 1
+            end = data.find(newline, start)
+
+    def __iter__(self):
+        return self.iter_players()
+
+
 def iter_blocks(data, count):
     for i in range(0, len(data), count):
         yield data[i:i + count]
 
 
-def parse_servers_response(servers_packet):
-    for server_data in iter_blocks(servers_packet[22:], 7):
-        if server_data == six.b('\\EOT\x00\x00\x00'):
-            raise StopIteration
+def getservers_packet(game, protocol, filters=('empty', 'full'), ext=False):
+    """Request of servers list for master server
+
+    Args:
+        game --- game name, like Xonotic
+        protocol --- protocol version of game
+        filters --- words like empty, full, ipv4, ipv6
+        ext --- use getserversExt, response of which could contain IPv6
+        servers
+    """
+    words = ['getserversExt' if ext else 'getservers', game, str(protocol)]
+    words.extend(filters)
+    return QUAKE_PACKET_HEADER + ' '.join(words).encode('ascii')
+
+
+def parse_master_entries(data, packed=False, ipv4_sep=six.b('\\'),
+                         ipv6_sep=six.b('/')):
+    """Parse servers entries of master response without header and EOT
+
+    IPv4 entry is backslash, 4 bytes of address and port, IPv6 entry of
+    getserversExt response is slash, 16 bytes of address and port. Runs of
+    entries of same type are unpacked at once.
+
+    Args:
+        data --- bytes of entries
+        packed --- return addresses as integers instead of strings
+
+    Returns: list of (ip, port)
+
+    Raises: ValueError if data is invalid
+    """
+    size = len(data)
+    if size % 7 == 0 and data[::7] == ipv4_sep * (size // 7):
+        # only IPv4 entries, usual getservers response
+        runs = [(0, size, 7)]
+    else:
+        runs = []
+        pos = 0
+        while pos < size:
+            sep = data[pos:pos + 1]
+            if sep == ipv4_sep:
+                entry_size = 7
+            elif sep == ipv6_sep:
+                entry_size = 19
+            else:
+                raise ValueError('Bad packet format')
+
+            if pos + entry_size > size:
+                raise ValueError('Bad packet format')
+
+            if runs and runs[-1][2] == entry_size:
+                runs[-1] = (runs[-1][0], pos + entry_size, entry_size)
+            else:
+                runs.append((pos, pos + entry_size, entry_size))
+
+            pos += entry_size
+
+    view = memoryview(data)
+    servers = []
+    for start, end, entry_size in runs:
+        entries = view[start:end]
+        if entry_size == 7 and packed:
+            servers.extend(iter_unpack(MASTER_IPV4_PACKED_ENTRY, entries))
+        elif entry_size == 7:
+            servers.extend([
+                (socket.inet_ntoa(ip), port)
+                for ip, port in iter_unpack(MASTER_IPV4_ENTRY, entries)])
+        elif packed:
+            servers.extend([
+                (high << 64 | low, port) for high, low, port in
+                iter_unpack(MASTER_IPV6_PACKED_ENTRY, entries)])
+        else:
+            servers.extend([
+                (socket.inet_ntop(socket.AF_INET6, ip), port)
+                for ip, port in iter_unpack(MASTER_IPV6_ENTRY, entries)])
+
+    return servers
+
+
+def split_master_response(packet):
+    """Returns tuple (entries bytes, MASTER_EOT, MASTER_EOF or None)
+
+    Raises: ValueError if packet is not master response
+    """
+    if isinstance(packet, memoryview):
+        packet = packet.tobytes()
+
+    if packet_startswith(packet, MASTER_EXT_RESPONSE_HEADER):
+        start = len(MASTER_EXT_RESPONSE_HEADER)
+    elif packet_startswith(packet, MASTER_RESPONSE_HEADER):
+        start = len(MASTER_RESPONSE_HEADER)
+    else:
+        raise ValueError('Not a master response')
+
+    end = len(packet)
+    terminator = packet[-7:]
+    if terminator in (MASTER_EOT, MASTER_EOF):
+        end -= 7
+    else:
+        terminator = None
+
+    return packet[start:end], terminator
+
+
+def parse_servers_response(servers_packet, packed=False):
+    """Parse servers of master response packet terminated by EOT or EOF
+
+    Args:
+        servers_packet --- getserversResponse or getserversExtResponse
+        packed --- return addresses as integers instead of strings
+
+    Returns: list of (ip, port)
+
+    Raises: ValueError if packet is invalid
+    """
+    data, terminator = split_master_response(servers_packet)
+    if terminator is None:
+        raise ValueError('Packet have no EOT signature')
 
-        s, server_ip, server_port = struct.unpack('>c4sH', server_data)
-        if s != six.b('\\'):
-            raise ValueError('Bad packet format')
-        server_ip = socket.inet_ntoa(server_ip)
+    return parse_master_entries(data, packed)
 
-        yield server_ip, server_port
 
-    raise ValueError('Packet have no EOT signature')
+def parse_master_response(packet, packed=False):
+    """Parse getserversResponse or getserversExtResponse packet
+
+    Master splits long list to many packets, last one is terminated by EOT
+    and others by EOF.
+
+    Returns: tuple (list of (ip, port), True if it is last packet)
+
+    Raises: ValueError if packet is invalid
+    """
+    data, terminator = split_master_response(packet)
+    return parse_master_entries(data, packed), terminator == MASTER_EOT